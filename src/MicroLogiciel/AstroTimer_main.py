@@ -10,9 +10,13 @@ import os
 import json
 import logging
 import logging.config
-from PIL import Image, ImageFont
 
 from lib import LCD_display
+from lib.Asset_manager import AssetManager
+from lib.Text_cache import TextCache
+from lib.Font_atlas import FontBook, load_atlases
+from lib.Event_loop import EventLoop
+from lib.Input_queue import InputQueue
 from lib.UI_generator import PageManager
 
 abspath = os.path.abspath(__file__)
@@ -51,46 +55,112 @@ class MainApp:
         # Set default path for assets, fonts, wifi and website
         self._general_config = {key:path for key, path in self.general_config["paths"].items()}
         
+        # Decode every asset once, shared by all the pages
+        self._general_config['ASSETS'] = AssetManager(self._general_config['PATH_ASSETS'])
+        
         # Set default icon for bad icon request
-        self._general_config['default_icon'] = Image.open(f"{self._general_config['PATH_ASSETS']}Icon_Empty.png")
+        self._general_config['default_icon'] = self._general_config['ASSETS'].get("Icon_Empty.png")
         
         # Set update times
         self._general_config["UPDATE_TIMES"] = {key:data for key, data in self.general_config['update_times'].items()}
         
-        # Set fonts dictionary
-        self._general_config['FONTS'] = {key: ImageFont.truetype(self._general_config['PATH_FONTS'] + data['path'], data['size']) for key, data in self.general_config["fonts"].items()}
+        # Set fonts dictionary, TrueType fonts are opened on first use
+        self._general_config['FONTS'] = FontBook(self.general_config["fonts"], self._general_config['PATH_FONTS'])
+        
+        # Cache the rendered strings, shared by all the pages, from the
+        # memory-mapped glyph atlases
+        atlases = load_atlases(self.general_config["fonts"], self._general_config['PATH_FONTS'], self._general_config['PATH_FONT_ATLAS'])
+        self._general_config['TEXT_CACHE'] = TextCache(self._general_config['FONTS'], atlases)
+        
+        # Set trigger process options
+        self._general_config['TRIGGER'] = {key:data for key, data in self.general_config['trigger'].items()}
         
         # Set battery icon dictionary
-        self._general_config['BATTERY_DICT'] = {data: f"{self._general_config['PATH_ASSETS']}{key}" for key, data in self.general_config["battery_icons"].items()}
+        self._general_config['BATTERY_DICT'] = {data: key for key, data in self.general_config["battery_icons"].items()}
         
         # Initialise LCD class
         self._general_config['LCD'] = LCD_display.LCD_1inch47(**self.general_config["display"])
         
+        # Main thread event loop, woken by the other threads
+        self._general_config['EVENT_LOOP'] = EventLoop()
+        
         self.page_manager = PageManager(UI_config_path, self._general_config)
         self.page_manager.show_page("main_menu_page")#"sequence_parameter_page")#
         
+        # Build the likely next pages while the main menu is on screen, the
+        # other ones are built on first navigation
+        self.page_manager.warm_up(self.general_config["warm_up_pages"])
+        
+        # Debounced key presses, dispatched in bursts on the event loop thread,
+        # the keyboard keys don't bounce
+        input_config = dict(self.general_config["input"])
+        if not RUN_ON_RPi:
+            input_config['debounce'] = 0
+        self.input_queue = InputQueue(self._general_config['EVENT_LOOP'], self.handle_keys, self.is_held, **input_config)
+        
+        # Keys currently held down, the keyboard auto-repeat is ignored
+        self.held_keys = set()
+        
         if RUN_ON_RPi:
+            self.key_pins = dict(self.general_config['GPIO_5_way_switch'])
             self.general_config['GPIO_5_way_switch'] = {value:key for key, value in self.general_config['GPIO_5_way_switch'].items()}
             for pin in self.general_config['GPIO_5_way_switch'].keys():
                 GPIO.setup(pin, GPIO.IN, pull_up_down=GPIO.PUD_UP)
                 GPIO.add_event_detect(pin, GPIO.FALLING, callback=self.on_press)
         else:
-            self.listener = keyboard.Listener(on_press=self.on_press)
+            self.listener = keyboard.Listener(on_press=self.on_press, on_release=self.on_release)
             self.listener.start()
         return None
     
     def on_press(self, key_name)->None:
+        self.class_logger.debug("queue key press",
+                                extra={'className':f"{self.__class__.__name__}:"})
+        try:
+            key = self.general_config['GPIO_5_way_switch'][key_name] if RUN_ON_RPi else key_name.name
+        except AttributeError:
+            return None
+        if not RUN_ON_RPi:
+            if key in self.held_keys:
+                return None
+            self.held_keys.add(key)
+        self.input_queue.press(key)
+        return None
+    
+    def on_release(self, key_name)->None:
+        self.class_logger.debug("release key",
+                                extra={'className':f"{self.__class__.__name__}:"})
+        self.held_keys.discard(getattr(key_name, 'name', None))
+        return None
+    
+    def is_held(self, key:str)->bool:
+        # The switch pins are pulled up, low while pressed
+        if RUN_ON_RPi:
+            return GPIO.input(self.key_pins[key]) == GPIO.LOW
+        return key in self.held_keys
+    
+    def handle_keys(self, keys:list)->None:
+        self.class_logger.debug("handle keys burst",
+                                extra={'className':f"{self.__class__.__name__}:"})
+        # Every key of the burst changes the page state, the screen is only
+        # rendered once for the last state
+        with self._general_config['COMPOSITOR'].batch():
+            for key, repeat in keys:
+                self.handle_key(key, repeat)
+        return None
+    
+    def handle_key(self, key:str, repeat:int=0)->None:
         self.class_logger.debug("handle keys callbacks",
                                 extra={'className':f"{self.__class__.__name__}:"})
-        key = self.general_config['GPIO_5_way_switch'][key_name] if RUN_ON_RPi else key_name.name
         try:
             if self.page_manager.current_page._config['class'] == "MainMenuPage":
                 if key == "left":
                     if self.page_manager.current_page:
                         self.page_manager.page_stack.append(self.page_manager.current_page)
-                    self.page_manager.current_page = self.page_manager.pages["shutdown_page"]
+                    self.page_manager.current_page = self.page_manager.get_page("shutdown_page")
                     self.page_manager.current_page.display()
                     return None
+            # Only the hold repeats of a key accelerate the parameter steps
+            self.page_manager.current_page.key_repeat = repeat
             self.page_manager.current_page.navigate(key)
         except AttributeError:
             pass
@@ -99,8 +169,8 @@ class MainApp:
     def run(self)->None:
         self.class_logger.debug("Running the MainApp",
                                 extra={'className':f"{self.__class__.__name__}:"})
-        while not self.page_manager.QUIT:
-            continue
+        # Sleep until PageManager.shutdown() stops the event loop
+        self._general_config['EVENT_LOOP'].run()
         return None
     
     def clean_stop(self)->None:
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 17 14:20:37 2026
+
+@author: Er-berry
+"""
+
+import os
+import logging
+import logging.config
+import threading
+import collections
+from PIL import Image
+
+SCRIPT_NAME = __file__.split('/')[-1]
+
+logging.config.fileConfig('logging.conf')
+lib_logger = logging.getLogger('libLogger')
+lib_logger.debug("Imported file")
+
+
+class AssetManager:
+    class_logger = logging.getLogger('classLogger')
+    
+    IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp')
+    DEFAULT_ASSET = "Icon_Empty.png"
+    
+    def __init__(self, path_assets:str, variants_size:int=32)->None:
+        self.class_logger.info("decode and convert every asset",
+                               extra={'className':f"{self.__class__.__name__}:"})
+        self.path_assets = path_assets
+        self.variants_size = variants_size
+        
+        # Assets are stored once in RGBA with their alpha mask (None when
+        # fully opaque) and shared read-only with the pages
+        self._assets = {}
+        self._masks = {}
+        for file_name in sorted(os.listdir(path_assets)):
+            if file_name.lower().endswith(self.IMAGE_EXTENSIONS):
+                self._assets[file_name], self._masks[file_name] = self._load(f"{path_assets}{file_name}")
+        
+        # Least recently used cache of the resized assets
+        self._variants = collections.OrderedDict()
+        self._variants_lock = threading.Lock()
+        return None
+    
+    def _load(self, path:str)->tuple:
+        self.class_logger.debug(f"load asset '{path}'",
+                                extra={'className':f"{self.__class__.__name__}:"})
+        with Image.open(path) as image:
+            image = image.convert("RGBA")
+        return self._freeze(image)
+    
+    def _freeze(self, image:Image.Image)->tuple:
+        mask = image.getchannel("A")
+        if mask.getextrema() == (255, 255):
+            mask = None
+        else:
+            mask.readonly = 1
+        # Drawing on a read-only image copies it first
+        image.readonly = 1
+        return image, mask
+    
+    def _key(self, name:str)->str:
+        if name not in self._assets:
+            self.class_logger.warning(f"unknown asset '{name}', use '{self.DEFAULT_ASSET}'",
+                                      extra={'className':f"{self.__class__.__name__}:"})
+            return self.DEFAULT_ASSET
+        return name
+    
+    def _variant(self, name:str, size:tuple, resample:int)->tuple:
+        key = (name, tuple(size), resample)
+        with self._variants_lock:
+            if key in self._variants:
+                self._variants.move_to_end(key)
+                return self._variants[key]
+        variant = self._freeze(self._assets[name].resize(size, resample))
+        with self._variants_lock:
+            self._variants[key] = variant
+            while len(self._variants) > self.variants_size:
+                self._variants.popitem(last=False)
+        return variant
+    
+    def get(self, name:str, size:tuple=None, resample:int=Image.Resampling.NEAREST)->Image.Image:
+        self.class_logger.debug(f"get asset '{name}'",
+                                extra={'className':f"{self.__class__.__name__}:"})
+        name = self._key(name)
+        if (size is None) or (tuple(size) == self._assets[name].size):
+            return self._assets[name]
+        return self._variant(name, size, resample)[0]
+    
+    def mask(self, name:str, size:tuple=None, resample:int=Image.Resampling.NEAREST)->Image.Image:
+        self.class_logger.debug(f"get asset '{name}' mask",
+                                extra={'className':f"{self.__class__.__name__}:"})
+        name = self._key(name)
+        if (size is None) or (tuple(size) == self._assets[name].size):
+            return self._masks[name]
+        return self._variant(name, size, resample)[1]
+    
+    def paste(self, target:Image.Image, name:str, position:tuple, size:tuple=None)->Image.Image:
+        self.class_logger.debug(f"paste asset '{name}' at {position}",
+                                extra={'className':f"{self.__class__.__name__}:"})
+        asset = self.get(name, size)
+        target.paste(asset, position, self.mask(name, size))
+        return asset
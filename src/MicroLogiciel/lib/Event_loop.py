@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 17 19:05:32 2026
+
+@author: Er-berry
+"""
+
+import time
+import heapq
+import logging
+import logging.config
+import threading
+import itertools
+import collections
+
+SCRIPT_NAME = __file__.split('/')[-1]
+
+logging.config.fileConfig('logging.conf')
+lib_logger = logging.getLogger('libLogger')
+lib_logger.debug("Imported file")
+
+
+class Timer:
+    class_logger = logging.getLogger('classLogger')
+    
+    def __init__(self, deadline:float, interval:float, callback, args:tuple)->None:
+        # Deadline on the monotonic clock, interval is None for a one-shot
+        self.deadline = deadline
+        self.interval = interval
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+        return None
+
+
+class EventLoop:
+    class_logger = logging.getLogger('classLogger')
+    
+    def __init__(self)->None:
+        self.class_logger.info("initialise event loop",
+                               extra={'className':f"{self.__class__.__name__}:"})
+        # Callbacks posted by the other threads, run in order by run()
+        self._events = collections.deque()
+        self._condition = threading.Condition()
+        self._stopped = False
+        
+        # Timers heap of (deadline, sequence number, timer): the loop sleeps
+        # until the earliest deadline
+        self._timers = []
+        self._sequence = itertools.count()
+        return None
+    
+    def _schedule(self, timer:Timer)->Timer:
+        with self._condition:
+            heapq.heappush(self._timers, (timer.deadline, next(self._sequence), timer))
+            self._condition.notify()
+        return timer
+    
+    def call_later(self, delay:float, callback, *args)->Timer:
+        """
+        Run a callback once on the event loop thread after delay seconds,
+        thread-safe
+
+        """
+        return self._schedule(Timer(time.monotonic()+delay, None, callback, args))
+    
+    def call_every(self, interval:float, callback, *args, delay:float=None)->Timer:
+        """
+        Run a callback every interval seconds on the event loop thread, the
+        first time after delay seconds (default interval), thread-safe
+
+        """
+        delay = interval if delay is None else delay
+        return self._schedule(Timer(time.monotonic()+delay, interval, callback, args))
+    
+    def cancel(self, timer:Timer)->None:
+        # Cancelled timers are dropped when they reach the top of the heap
+        if timer is not None:
+            timer.cancelled = True
+        return None
+    
+    def _next_callback(self)->tuple:
+        # Called with the condition held, returns the callback to run or
+        # None when the loop is stopped
+        while not self._stopped:
+            if self._events:
+                return self._events.popleft()
+            while self._timers and self._timers[0][2].cancelled:
+                heapq.heappop(self._timers)
+            timeout = None
+            if self._timers:
+                now = time.monotonic()
+                deadline, _, timer = self._timers[0]
+                if deadline <= now:
+                    heapq.heappop(self._timers)
+                    if timer.interval is not None:
+                        # Periodic timers keep their phase, missed periods
+                        # are skipped
+                        timer.deadline += timer.interval
+                        if timer.deadline <= now:
+                            timer.deadline = now + timer.interval
+                        heapq.heappush(self._timers, (timer.deadline, next(self._sequence), timer))
+                    return timer.callback, timer.args
+                timeout = deadline - now
+            self._condition.wait(timeout)
+        return None
+    
+    def post(self, callback, *args)->None:
+        """
+        Queue a callback to run on the event loop thread, thread-safe
+
+        """
+        with self._condition:
+            self._events.append((callback, args))
+            self._condition.notify()
+        return None
+    
+    def stop(self)->None:
+        self.class_logger.info("stop event loop",
+                               extra={'className':f"{self.__class__.__name__}:"})
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+        return None
+    
+    def run(self)->None:
+        self.class_logger.info("run event loop",
+                               extra={'className':f"{self.__class__.__name__}:"})
+        # The thread sleeps until a callback is posted, a timer is due or the
+        # loop is stopped
+        while True:
+            with self._condition:
+                event = self._next_callback()
+            if event is None:
+                break
+            callback, args = event
+            try:
+                callback(*args)
+            except Exception as e:
+                self.class_logger.error(f"{type(e).__name__} in '{getattr(callback, '__name__', callback)}': {e}",
+                                        extra={'className':f"{self.__class__.__name__}:"})
+        self.class_logger.info("event loop stopped",
+                               extra={'className':f"{self.__class__.__name__}:"})
+        return None
@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 17 16:41:09 2026
+
+@author: Er-berry
+"""
+
+import os
+import json
+import logging
+import logging.config
+import collections.abc
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+SCRIPT_NAME = __file__.split('/')[-1]
+
+logging.config.fileConfig('logging.conf')
+lib_logger = logging.getLogger('libLogger')
+lib_logger.debug("Imported file")
+
+# Printable ASCII and Latin-1 characters stored in the atlases
+CHARSET = (*range(32, 127), *range(160, 256))
+
+# Glyph metrics columns: atlas column, width, height, left and top of the
+# bitmap from the pen position on the baseline, advance
+X, WIDTH, HEIGHT, LEFT, TOP, ADVANCE = range(6)
+
+
+def build_atlas(font_path:str, size:int, atlas_path:str)->None:
+    """
+    Rasterize the CHARSET glyphs of a TrueType font in a glyph atlas
+
+    Parameters
+    ----------
+    font_path : str
+        Path of the TrueType font
+    size : int
+        Font size in pixels
+    atlas_path : str
+        Path of the atlas without extension, the glyphs are saved in
+        '<atlas_path>.npy' and the metrics in '<atlas_path>.json'
+
+    Returns
+    -------
+    None
+
+    """
+    lib_logger.info(f"Build font atlas '{atlas_path}' from '{font_path}' ({size}px)")
+    font = ImageFont.truetype(font_path, size)
+    bitmaps = {}
+    metrics = {}
+    x = 0
+    for code in CHARSET:
+        char = chr(code)
+        left, top, right, bottom = font.getbbox(char, anchor='ls')
+        advance = int(font.getlength(char))
+        bitmap = np.zeros((0, 0), dtype=np.uint8)
+        if (right > left) and (bottom > top):
+            mask = Image.new(mode="L", size=(right-left, bottom-top), color=0)
+            ImageDraw.Draw(mask).text((-left, -top), char, font=font, fill=255, anchor='ls')
+            bitmap = np.asarray(mask)
+            rows = np.flatnonzero(bitmap.any(axis=1))
+            cols = np.flatnonzero(bitmap.any(axis=0))
+            if rows.size:
+                bitmap = bitmap[rows[0]:rows[-1]+1, cols[0]:cols[-1]+1]
+                left, top = left+int(cols[0]), top+int(rows[0])
+            else:
+                bitmap = np.zeros((0, 0), dtype=np.uint8)
+        bitmaps[code] = bitmap
+        metrics[code] = [x, bitmap.shape[1], bitmap.shape[0], left, top, advance]
+        x += bitmap.shape[1]
+    
+    glyphs = np.zeros((max(bitmap.shape[0] for bitmap in bitmaps.values()), x), dtype=np.uint8)
+    for code, bitmap in bitmaps.items():
+        glyphs[:bitmap.shape[0], metrics[code][X]:metrics[code][X]+bitmap.shape[1]] = bitmap
+    
+    # Shift of the text top between the baseline and the font wide anchors
+    reference = font.getbbox("A", anchor='ls')[1]
+    anchors = {key: font.getbbox("A", anchor=f"l{key}")[1]-reference for key in "amd"}
+    
+    os.makedirs(os.path.dirname(atlas_path) or '.', exist_ok=True)
+    np.save(f"{atlas_path}.npy", glyphs)
+    with open(f"{atlas_path}.json", 'w') as f:
+        json.dump({"font": font_path, "size": size, "anchors": anchors, "metrics": metrics}, f)
+    return None
+
+
+def load_atlases(fonts_config:dict, path_fonts:str, path_atlas:str)->dict:
+    """
+    Memory-map the glyph atlas of each configured font, building the missing
+    or outdated ones
+
+    Parameters
+    ----------
+    fonts_config : dict
+        'fonts' section of config_general.json
+    path_fonts : str
+        Directory of the TrueType fonts
+    path_atlas : str
+        Directory of the glyph atlases
+
+    Returns
+    -------
+    dict
+        FontAtlas instances keyed like the fonts configuration
+
+    """
+    atlases = {}
+    for key, data in fonts_config.items():
+        font_path = path_fonts + data['path']
+        atlas_path = path_atlas + key
+        try:
+            with open(f"{atlas_path}.json", 'r') as f:
+                header = json.load(f)
+            outdated = (header["font"] != font_path) or (header["size"] != data['size']) \
+                       or (os.path.getmtime(f"{atlas_path}.json") < os.path.getmtime(font_path)) \
+                       or not os.path.isfile(f"{atlas_path}.npy")
+        except (OSError, ValueError, KeyError):
+            outdated = True
+        if outdated:
+            build_atlas(font_path, data['size'], atlas_path)
+        atlases[key] = FontAtlas(atlas_path)
+    return atlases
+
+
+class FontAtlas:
+    class_logger = logging.getLogger('classLogger')
+    
+    def __init__(self, atlas_path:str)->None:
+        self.class_logger.debug(f"load font atlas '{atlas_path}'",
+                                extra={'className':f"{self.__class__.__name__}:"})
+        self.glyphs = np.load(f"{atlas_path}.npy", mmap_mode='r')
+        with open(f"{atlas_path}.json", 'r') as f:
+            header = json.load(f)
+        self.anchors = {**header["anchors"], 's': 0}
+        
+        # Metrics indexed by character code, codes out of the atlas are invalid
+        self.metrics = np.zeros((256, 6), dtype=np.int32)
+        self.valid = np.zeros(256, dtype=bool)
+        for code, metrics in header["metrics"].items():
+            self.metrics[int(code)] = metrics
+            self.valid[int(code)] = True
+        return None
+    
+    def render(self, text:str, anchor:str=None)->tuple:
+        """
+        Render a single line of text from the atlas, as ImageFont.getmask2
+
+        Parameters
+        ----------
+        text : str
+            Text to render
+        anchor : str, optional
+            Two letters text anchor (see PIL text anchors). The default is
+            None, the left ascender 'la'.
+
+        Returns
+        -------
+        tuple
+            (mask, (left, top)) with mask the uint8 coverage array, None for
+            a blank text, and (left, top) its position from the anchor.
+            None when a character is not in the atlas.
+
+        """
+        codes = np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32)
+        if (codes.size == 0) or (codes.max() > 255) or not self.valid[codes].all():
+            return None
+        anchor = anchor or 'la'
+        metrics = self.metrics[codes]
+        advances = metrics[:, ADVANCE]
+        pens = np.cumsum(advances) - advances
+        length = int(advances.sum())
+        
+        inked = metrics[:, WIDTH] > 0
+        x0 = pens[inked] + metrics[inked, LEFT]
+        y0 = metrics[inked, TOP]
+        x_min, x_max = min(0, int(x0.min(initial=0))), max(length, int((x0 + metrics[inked, WIDTH]).max(initial=0)))
+        y_min, y_max = min(0, int(y0.min(initial=0))), max(0, int((y0 + metrics[inked, HEIGHT]).max(initial=0)))
+        
+        x_anchor = {'l': 0, 'm': (length+1)//2, 'r': length}[anchor[0]]
+        if anchor[1] == 't':
+            top = 0
+        elif anchor[1] == 'b':
+            top = y_min - y_max
+        else:
+            top = y_min + self.anchors[anchor[1]]
+        left = x_min - x_anchor
+        
+        if not inked.any():
+            return None, (left, top)
+        mask = np.zeros((y_max-y_min, x_max-x_min), dtype=np.uint8)
+        for (x, width, height), gx, gy in zip(metrics[inked, :HEIGHT+1].tolist(), (x0-x_min).tolist(), (y0-y_min).tolist()):
+            target = mask[gy:gy+height, gx:gx+width]
+            np.maximum(target, self.glyphs[:height, x:x+width], out=target)
+        return mask, (left, top)
+
+
+class FontBook(collections.abc.Mapping):
+    class_logger = logging.getLogger('classLogger')
+    
+    def __init__(self, fonts_config:dict, path_fonts:str)->None:
+        self.class_logger.debug("initialise lazy TrueType fonts",
+                                extra={'className':f"{self.__class__.__name__}:"})
+        self.fonts_config = fonts_config
+        self.path_fonts = path_fonts
+        self._fonts = {}
+        return None
+    
+    def __getitem__(self, key:str)->ImageFont.FreeTypeFont:
+        # TrueType fonts are only opened for the text the atlases can't render
+        if key not in self._fonts:
+            data = self.fonts_config[key]
+            self._fonts[key] = ImageFont.truetype(self.path_fonts + data['path'], data['size'])
+        return self._fonts[key]
+    
+    def __iter__(self):
+        return iter(self.fonts_config)
+    
+    def __len__(self)->int:
+        return len(self.fonts_config)
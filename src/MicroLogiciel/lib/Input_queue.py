@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 17 20:14:26 2026
+
+@author: Er-berry
+"""
+
+import time
+import logging
+import logging.config
+import threading
+import collections
+
+SCRIPT_NAME = __file__.split('/')[-1]
+
+logging.config.fileConfig('logging.conf')
+lib_logger = logging.getLogger('libLogger')
+lib_logger.debug("Imported file")
+
+
+class InputQueue:
+    class_logger = logging.getLogger('classLogger')
+    
+    # Keys kept once per press in a burst, the other repeated keys are
+    # collapsed into a single press
+    REPEATABLE_KEYS = ('up', 'down')
+    
+    def __init__(self, event_loop, dispatch, is_held=None, debounce:float=0.05, repeat_delay:float=0.4, repeat_interval:float=0.1)->None:
+        self.class_logger.info("initialise input queue",
+                               extra={'className':f"{self.__class__.__name__}:"})
+        self.event_loop = event_loop
+        self.dispatch = dispatch
+        self.debounce = debounce
+        
+        # Repeatable keys held down are pressed again every repeat_interval
+        # seconds after repeat_delay, is_held(key) tells if a key is still down
+        self.is_held = is_held
+        self.repeat_delay = repeat_delay
+        self.repeat_interval = repeat_interval
+        
+        # Timestamped key presses waiting for the event loop thread, with the
+        # last edge of each key for the debounce and its last accepted press
+        self._presses = collections.deque()
+        self._last_edge = {}
+        self._last_press = {}
+        self._lock = threading.Lock()
+        self._drain_posted = False
+        return None
+    
+    def press(self, key:str, timestamp:float=None)->None:
+        """
+        Queue a key press from the GPIO or keyboard threads, thread-safe
+
+        Parameters
+        ----------
+        key : str
+            Key name ('up', 'down', 'left', 'right' or 'enter')
+        timestamp : float, optional
+            Press time on the monotonic clock. The default is None, now.
+
+        Returns
+        -------
+        None
+
+        """
+        timestamp = time.monotonic() if timestamp is None else timestamp
+        with self._lock:
+            # Every edge restarts the debounce window, bounced or not
+            last = self._last_edge.get(key)
+            self._last_edge[key] = timestamp
+            if (last is not None) and (timestamp - last < self.debounce):
+                self.class_logger.debug(f"ignore bounce of key '{key}'",
+                                        extra={'className':f"{self.__class__.__name__}:"})
+                return None
+        if self.is_held is None:
+            self._accept(key, timestamp)
+        else:
+            # The edges of a release bounce after a long hold pass the window,
+            # the key is only pressed if still down once the contacts settled
+            self.event_loop.call_later(self.debounce, self._confirm, key, timestamp)
+        return None
+    
+    def _confirm(self, key:str, timestamp:float)->None:
+        if not self.is_held(key):
+            self.class_logger.debug(f"ignore release bounce of key '{key}'",
+                                    extra={'className':f"{self.__class__.__name__}:"})
+            return None
+        self._accept(key, timestamp)
+        return None
+    
+    def _accept(self, key:str, timestamp:float)->None:
+        with self._lock:
+            self._last_press[key] = timestamp
+        if (self.is_held is not None) and (key in self.REPEATABLE_KEYS):
+            self.event_loop.call_later(self.repeat_delay, self._repeat, key, timestamp, 1)
+        self._queue(key, timestamp, 0)
+        return None
+    
+    def _queue(self, key:str, timestamp:float, repeat:int)->None:
+        with self._lock:
+            self._presses.append((key, timestamp, repeat))
+            # A single drain is posted for all the presses queued before it runs
+            if self._drain_posted:
+                return None
+            self._drain_posted = True
+        self.event_loop.post(self._drain)
+        return None
+    
+    def _repeat(self, key:str, timestamp:float, repeat:int)->None:
+        # Runs on the event loop thread: the next repeat is scheduled once
+        # this one is dispatched, so a slow page skips repeats instead of
+        # queueing them. repeat counts the repeats since the key was pressed
+        with self._lock:
+            if self._last_press.get(key) != timestamp:
+                return None
+        if not self.is_held(key):
+            return None
+        self._queue(key, time.monotonic(), repeat)
+        self._drain()
+        self.event_loop.call_later(self.repeat_interval, self._repeat, key, timestamp, repeat+1)
+        return None
+    
+    def _coalesce(self, presses:list)->list:
+        # (key, repeat) pairs, repeat is 0 for a fresh press
+        keys = []
+        for key, _, repeat in presses:
+            if keys and (key == keys[-1][0]) and (key not in self.REPEATABLE_KEYS):
+                continue
+            keys.append((key, repeat))
+        return keys
+    
+    def _drain(self)->None:
+        with self._lock:
+            presses = list(self._presses)
+            self._presses.clear()
+            self._drain_posted = False
+        if not presses:
+            return None
+        keys = self._coalesce(presses)
+        self.class_logger.debug(f"dispatch {len(keys)} of {len(presses)} key presses, {(time.monotonic()-presses[0][1])*1000:.1f}ms after the first one",
+                                extra={'className':f"{self.__class__.__name__}:"})
+        self.dispatch(keys)
+        return None
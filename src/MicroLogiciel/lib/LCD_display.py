@@ -1,10 +1,14 @@
 import os
 import time
 import logging
+import functools
+import threading
 import logging.config
 import numpy as np
 from PIL import Image
 
+from lib.ST7789_emulator import EmulatedRaspberryPi
+
 OPERATING_SYSTEM = os.uname()
 RUN_ON_RPi = (OPERATING_SYSTEM.sysname == 'Linux') and (OPERATING_SYSTEM.machine in ['aarch64', 'armv6l'])
 
@@ -26,12 +30,6 @@ TRANSPOSE       = 5
 TRANSVERSE     	= 6
 
 
-# TODO: add night vision mode to LCD with this code:
-#   black_img = Image.new(mode="RGB", size=self.LCD.size[::-1], color=(0)).split()[0]
-#   alpha_img = Image.new(mode="RGB", size=self.LCD.size[::-1], color=(255)).split()[0]
-#   red_frame = Image.merge('RGBA', (self.LCD.screen_img.split()[0], black_img, black_img, alpha_img))
-#   self.LCD.screen_img = Image.blend(self.LCD.screen_img, red_frame, alpha=0.6)
-
 if RUN_ON_RPi:
     import spidev
     class RaspberryPi:
@@ -125,48 +123,212 @@ if RUN_ON_RPi:
 
 class LCD_1inch47():
     class_logger = logging.getLogger('displayLogger')
-    def __init__(self, spi_bus=0, spi_device=0, spi_freq=40000000, rst=27, dc=25, bl=18, bl_freq=1000):
+    
+    # Partial refresh tuning: changed pixels closer than DIRTY_MERGE_GAP are
+    # grouped in the same region, a window setup costs about DIRTY_WINDOW_COST
+    # pixels of transfer, and above FULL_FRAME_RATIO of the screen the whole
+    # frame is sent
+    DIRTY_MERGE_GAP = 8
+    DIRTY_WINDOW_COST = 32
+    FULL_FRAME_RATIO = 0.5
+    
+    # Smoothing of the measured frame send time
+    FRAME_TIME_SMOOTHING = 0.2
+    
+    # Display rotation in degrees, as the PIL transpose it replaces, mapped to
+    # (MADCTL value, column offset, row offset) of the 172x320 visible area
+    ROTATIONS = {
+        0   : (0x00, 34, 0),
+        90  : (0x60, 0, 34),
+        180 : (0xC0, 34, 0),
+        270 : (0xA0, 0, 34),
+        }
+    
+    # Pixel formats as (COLMOD value, pixels per unit, bytes per unit): RGB444
+    # packs two pixels in three bytes and cuts the frame size by 25%
+    PIXEL_FORMATS = {
+        'RGB565' : (0x05, 1, 2),
+        'RGB444' : (0x03, 2, 3),
+        }
+    
+    # Night vision gain of the red, green and blue channels, applied by the
+    # packer lookup tables
+    NIGHT_VISION_GAINS = (1.0, 0.0, 0.0)
+    
+    # ST7789 power-on configuration as (command, data[, delay_s]) entries,
+    # MADCTL (0x36) and COLMOD (0x3A) are sent first from the configuration
+    INIT_SEQUENCE = (
+        (0xB2, (0x0C, 0x0C, 0x00, 0x33, 0x33)),
+        (0xB7, (0x35,)),
+        (0xBB, (0x35,)),
+        (0xC0, (0x2C,)),
+        (0xC2, (0x01,)),
+        (0xC3, (0x13,)),
+        (0xC4, (0x20,)),
+        (0xC6, (0x0F,)),
+        (0xD0, (0xA4, 0xA1)),
+        (0xE0, (0xF0, 0xF0, 0x00, 0x04, 0x04, 0x04, 0x05, 0x29, 0x33, 0x3E, 0x38, 0x12, 0x12, 0x28, 0x30)),
+        (0xE1, (0xF0, 0x07, 0x0A, 0x0D, 0x0B, 0x07, 0x28, 0x33, 0x3E, 0x36, 0x14, 0x14, 0x29, 0x32)),
+        (0x21, ()),
+        (0x11, (), 0.005),  # sleep out needs 5 ms before the next command
+        (0x29, ()),
+        )
+    
+    def __init__(self, spi_bus=0, spi_device=0, spi_freq=40000000, rst=27, dc=25, bl=18, bl_freq=1000, rotation=0, pixel_format='RGB565', night_vision=False, emulate=False):
         self.class_logger.info("initialise LCD_1inch47 display",
                                extra={'className':f"{self.__class__.__name__}:"})
-        if RUN_ON_RPi:
-            self.instance = RaspberryPi(spi_bus, spi_device, spi_freq, rst, dc, bl, bl_freq)
-            self.Init()
-        
         self.width = 172
         self.height = 320
         self.size = (self.width, self.height)
-        self.__black_frame = Image.new(mode="RGBA", size=(self.height, self.width), color=(0, 0, 0, 255))
-        self.screen_img = self.__black_frame
+        
+        if rotation not in self.ROTATIONS:
+            self.class_logger.error(f"Unsupported display rotation {rotation}, expected one of {list(self.ROTATIONS.keys())}",
+                                    extra={'className':f"{self.__class__.__name__}:"})
+            raise ValueError(f"Unsupported display rotation {rotation}")
+        self.rotation = rotation
+        self._madctl, self._x_offset, self._y_offset = self.ROTATIONS[rotation]
+        # Size of the frames sent to the controller: landscape when MADCTL
+        # exchanges rows and columns
+        if rotation in (90, 270):
+            self.frame_size = (self.height, self.width)
+        else:
+            self.frame_size = self.size
+        frame_width, frame_height = self.frame_size
+        
+        if pixel_format not in self.PIXEL_FORMATS:
+            self.class_logger.error(f"Unsupported pixel format {pixel_format}, expected one of {list(self.PIXEL_FORMATS.keys())}",
+                                    extra={'className':f"{self.__class__.__name__}:"})
+            raise ValueError(f"Unsupported pixel format {pixel_format}")
+        self.pixel_format = pixel_format
+        self._colmod, self._unit_pixels, self._unit_bytes = self.PIXEL_FORMATS[pixel_format]
+        self._pack_format = getattr(self, f"_pack_{pixel_format.lower()}")
+        self._night_vision_luts = self._build_night_vision_luts()
+        self.night_vision = night_vision
+        self._pack_frame = self._pack_night_vision if night_vision else self._pack_format
+        frame_units = frame_width // self._unit_pixels
+        
+        # Hardware scrolling moves the picture along the panel's 320 lines,
+        # which are the frame columns in landscape and the frame rows in
+        # portrait. Rotations 90 and 180 mirror that axis.
+        self._scroll_axis = 1 if rotation in (90, 270) else 0
+        self._scroll_mirrored = rotation in (90, 180)
+        self._scroll_area = (0, self.height)
+        self._scroll_offset = 0
+        
+        if RUN_ON_RPi or emulate:
+            if RUN_ON_RPi:
+                self.instance = RaspberryPi(spi_bus, spi_device, spi_freq, rst, dc, bl, bl_freq)
+            else:
+                self.class_logger.warning("display SPI bus is emulated",
+                                          extra={'className':f"{self.__class__.__name__}:"})
+                self.instance = EmulatedRaspberryPi(spi_bus, spi_device, spi_freq, rst, dc, bl, bl_freq)
+            self._bind_transport()
+            self._init_stream = self._compile_commands(((0x36, (self._madctl,)), (0x3A, (self._colmod,)), *self.INIT_SEQUENCE))
+            self.Init()
+        else:
+            self.instance = None
+        
+        # Landscape RGBA canvas shared with PIL: pages draw into this memory
+        # and the packer reads it directly, without copy or PIL rotation
+        self._canvas = np.zeros((self.width, self.height, 4), dtype=np.uint8)
+        self._canvas[...,3] = 255
+        self.screen_img = Image.frombuffer("RGBA", (self.height, self.width), self._canvas, "raw", "RGBA", 0, 1)
+        self.screen_img.readonly = 0
+        
+        # Two preallocated frames, laid out as the bytes sent on the SPI bus
+        # (rows of units of one or two pixels): submit_frame() packs into the
+        # back one while the flush thread sends the front one
+        self._buffers = [np.empty((frame_height, frame_units, self._unit_bytes), dtype=np.uint8) for _ in range(2)]
+        self._back = 0
+        self._frame_pending = False
+        self._frame_condition = threading.Condition()
+        self._spi_lock = threading.Lock()
+        self._flush_stop = False
+        self._pack_buffer = np.empty((frame_height, frame_units), dtype=np.uint8)
+        self._clear_buffers = {}
+        
+        # Damaged regions of the pending frame, None when it was fully packed.
+        # Partial packing starts from the last packed frame, valid once a
+        # full frame was packed with the current packer
+        self._pending_damage = None
+        self._packed_valid = False
+        
+        # Last frame sent to the display, used to only send changed regions
+        self._last_buffer = np.empty_like(self._buffers[0])
+        self._last_buffer_valid = False
+        if self._unit_bytes == 2:
+            self._last_pixels = self._last_buffer.view('>u2')[...,0]
+        else:
+            self._diff_bytes = np.empty_like(self._last_buffer, dtype=bool)
+        self._diff_mask = np.empty((frame_height, frame_units), dtype=bool)
+        self._full_window_stream = None
+        
+        # Time to send a frame on the SPI bus, estimated from the bus speed
+        # and averaged on the frames sent: the achievable frame period
+        self.frame_time = frame_height*frame_units*self._unit_bytes*8/spi_freq
+        
+        if self.instance is not None:
+            self.flush_thread = threading.Thread(target=self._flush_loop, daemon=True)
+            self.flush_thread.start()
+        else:
+            self.flush_thread = None
         return None
     
-    def __getattr__(self, name):
-        self.class_logger.debug("attribute not found",
+    def _bind_transport(self):
+        self.class_logger.debug("bind DC pin and SPI bus writers",
                                 extra={'className':f"{self.__class__.__name__}:"})
-        # assume it is implemented by self.instance
-        return self.instance.__getattribute__(name)
+        # Bound once so the transfer path goes straight to RPi.GPIO and spidev
+        self._dc_write = functools.partial(self.instance.GPIO.output, self.instance.DC_PIN)
+        self._spi_write = self.instance.SPI.writebytes2
+        self._dc_level = None
+        return None
     
-    def _command(self, cmd):
-        self.class_logger.debug("send command to display via SPI",
-                                extra={'className':f"{self.__class__.__name__}:"})
-        self.digital_write(self.DC_PIN, self.GPIO.LOW)
-        self.spi_writebyte([cmd])
+    def _compile_commands(self, commands):
+        # Turn (command, data[, delay_s]) entries into (DC level, payload,
+        # delay_s) transactions, joining consecutive bytes of the same level
+        stream = []
+        for entry in commands:
+            cmd, data = entry[0], entry[1]
+            delay = entry[2] if len(entry) > 2 else 0
+            for level, payload in ((0, bytes((cmd,))), (1, data)):
+                if len(payload) == 0:
+                    continue
+                if isinstance(payload, (tuple, list)):
+                    payload = bytes(payload)
+                if stream and (stream[-1][0] == level) and not stream[-1][2] \
+                   and isinstance(payload, bytes) and isinstance(stream[-1][1], bytes):
+                    stream[-1] = (level, stream[-1][1] + payload, 0)
+                else:
+                    stream.append((level, payload, 0))
+            if delay:
+                stream[-1] = (*stream[-1][:2], delay)
+        return stream
+    
+    def _send_stream(self, stream):
+        for level, payload, delay in stream:
+            if level != self._dc_level:
+                self._dc_write(level)
+                self._dc_level = level
+            self._spi_write(payload)
+            if delay:
+                time.sleep(delay)
         return None
-        
-    def _data(self, val):
-        self.class_logger.debug("send data to display via SPI",
+    
+    def _send_commands(self, commands):
+        self.class_logger.debug("send command stream to display via SPI",
                                 extra={'className':f"{self.__class__.__name__}:"})
-        self.digital_write(self.DC_PIN, self.GPIO.HIGH)
-        self.spi_writebyte([val])
+        self._send_stream(self._compile_commands(commands))
         return None
     
     def _reset(self):
         self.class_logger.debug("reset display",
                                 extra={'className':f"{self.__class__.__name__}:"})
-        self.GPIO.output(self.RST_PIN, self.GPIO.HIGH)
+        GPIO = self.instance.GPIO
+        GPIO.output(self.instance.RST_PIN, GPIO.HIGH)
         time.sleep(0.01)
-        self.GPIO.output(self.RST_PIN, self.GPIO.LOW)
+        GPIO.output(self.instance.RST_PIN, GPIO.LOW)
         time.sleep(0.01)
-        self.GPIO.output(self.RST_PIN, self.GPIO.HIGH)
+        GPIO.output(self.instance.RST_PIN, GPIO.HIGH)
         time.sleep(0.01)
         return None
     
@@ -175,111 +337,38 @@ class LCD_1inch47():
                                extra={'className':f"{self.__class__.__name__}:"})
         self.instance.module_init()
         self._reset()
-        
-        self._command(0x36)
-        self._data(0x00)
-        
-        self._command(0x3A)
-        self._data(0x05)
-        
-        self._command(0xB2)
-        self._data(0x0C)
-        self._data(0x0C)
-        self._data(0x00)
-        self._data(0x33)
-        self._data(0x33)
-        
-        self._command(0xB7)
-        self._data(0x35)
-        
-        self._command(0xBB)
-        self._data(0x35)
-        
-        self._command(0xC0)
-        self._data(0x2C)
-        
-        self._command(0xC2)
-        self._data(0x01)
-        
-        self._command(0xC3)
-        self._data(0x13)
-        
-        self._command(0xC4)
-        self._data(0x20)
-        
-        self._command(0xC6)
-        self._data(0x0F)
-        
-        self._command(0xD0)
-        self._data(0xA4)
-        self._data(0xA1)
-        
-        self._command(0xE0)
-        self._data(0xF0)
-        self._data(0xF0)
-        self._data(0x00)
-        self._data(0x04)
-        self._data(0x04)
-        self._data(0x04)
-        self._data(0x05)
-        self._data(0x29)
-        self._data(0x33)
-        self._data(0x3E)
-        self._data(0x38)
-        self._data(0x12)
-        self._data(0x12)
-        self._data(0x28)
-        self._data(0x30)
-        
-        self._command(0xE1)
-        self._data(0xF0)
-        self._data(0x07)
-        self._data(0x0A)
-        self._data(0x0D)
-        self._data(0x0B)
-        self._data(0x07)
-        self._data(0x28)
-        self._data(0x33)
-        self._data(0x3E)
-        self._data(0x36)
-        self._data(0x14)
-        self._data(0x14)
-        self._data(0x29)
-        self._data(0x32)
-        
-        self._command(0x21)
-        
-        self._command(0x11)
-        
-        self._command(0x29)
+        self._last_buffer_valid = False
+        self._dc_level = None
+        self._scroll_area = (0, self.height)
+        self._scroll_offset = 0
+        self._send_stream(self._init_stream)
         return None
     
+    def _window_commands(self, Xstart, Ystart, Xend, Yend):
+        Xstart, Xend = Xstart+self._x_offset, Xend-1+self._x_offset
+        Ystart, Yend = Ystart+self._y_offset, Yend-1+self._y_offset
+        return ((0x2A, bytes((Xstart>>8 & 0xff, Xstart & 0xff, Xend>>8 & 0xff, Xend & 0xff))),
+                (0x2B, bytes((Ystart>>8 & 0xff, Ystart & 0xff, Yend>>8 & 0xff, Yend & 0xff))))
+    
     def SetWindows(self, Xstart, Ystart, Xend, Yend):
         self.class_logger.info("set display view windows",
                                extra={'className':f"{self.__class__.__name__}:"})
-        #set the X coordinates
-        self._command(0x2A)
-        self._data((Xstart)>>8& 0xff)     #Set the horizontal starting point to the high octet
-        self._data((Xstart+34)   & 0xff)  #Set the horizontal starting point to the low octet
-        self._data((Xend-1+34)>>8& 0xff)  #Set the horizontal end to the high octet
-        self._data((Xend-1+34)   & 0xff)  #Set the horizontal end to the low octet 
-        
-        #set the Y coordinates
-        self._command(0x2B)
-        self._data((Ystart)>>8& 0xff)
-        self._data((Ystart)   & 0xff)
-        self._data((Yend-1)>>8& 0xff)
-        self._data((Yend-1)   & 0xff)
-        
-        self._command(0x2C)
+        self._send_commands((*self._window_commands(Xstart, Ystart, Xend, Yend), (0x2C, b'')))
         return None
-        
+    
     def _reset_frame(self):
         self.class_logger.debug("reset current frame",
                                extra={'className':f"{self.__class__.__name__}:"})
-        self.screen_img = self.__black_frame
+        self._canvas[...,:3] = 0
+        self._canvas[...,3] = 255
         return None
     
+    def new_frame(self):
+        self.class_logger.debug("start a new frame on the shared canvas",
+                               extra={'className':f"{self.__class__.__name__}:"})
+        self._reset_frame()
+        return self.screen_img
+    
     def _imagePreProcessing(self, image):
         self.class_logger.info("pre_process frame to fit display",
                                extra={'className':f"{self.__class__.__name__}:"})
@@ -319,51 +408,401 @@ class LCD_1inch47():
                                               extra={'className':f"{self.__class__.__name__}:"})
         return image
     
-    def ShowImage(self, image=None, show=False):
-        self.class_logger.info("display frame on screen",
-                               extra={'className':f"{self.__class__.__name__}:"})
-        if not image:
-            image = self.screen_img
+    def _prepare_image(self, image, show):
+        if (image is None) or (image is self.screen_img):
+            if show:
+                self.screen_img.show()
+            if self.frame_size == self.size:
+                # Portrait view of the canvas, turned like ROTATE_270
+                return np.rot90(self._canvas, k=-1)
+            # The controller rotates landscape frames itself
+            return self._canvas
         
-        image = self._imagePreProcessing(image)
+        if self.frame_size == self.size:
+            image = self._imagePreProcessing(image)
+        elif image.size == self.size:
+            image = image.transpose(ROTATE_90)
         
         imwidth, imheight = image.size
-        if imwidth != self.width or imheight != self.height:
-            self.class_logger.error(f"Image must be same dimensions as display ({self.width}x{self.height}).",
+        frame_width, frame_height = self.frame_size
+        if imwidth != frame_width or imheight != frame_height:
+            self.class_logger.error(f"Image must be same dimensions as display ({frame_width}x{frame_height}).",
                                     extra={'className':f"{self.__class__.__name__}:"})
-            raise ValueError(f"Image must be same dimensions as display ({self.width}x{self.height}).")
+            raise ValueError(f"Image must be same dimensions as display ({frame_width}x{frame_height}).")
         if show:
+            if self.frame_size == self.size:
                 image.transpose(ROTATE_90).show()
+            else:
+                image.show()
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGB")
+        return np.asarray(image)
+    
+    def set_night_vision(self, enabled):
+        self.class_logger.info(f"{'enable' if enabled else 'disable'} night vision mode",
+                               extra={'className':f"{self.__class__.__name__}:"})
+        # Takes effect on the next submitted frame
+        with self._frame_condition:
+            self.night_vision = enabled
+            self._pack_frame = self._pack_night_vision if enabled else self._pack_format
+            self._packed_valid = False
+        return None
+    
+    def _frame_regions(self, damage):
+        # Canvas rectangles to frame rectangles, aligned on the pixel units
+        regions = []
+        for x0, y0, x1, y1 in damage:
+            if self.frame_size == self.size:
+                # Portrait frame, the canvas turned like ROTATE_270
+                x0, y0, x1, y1 = self.width-y1, x0, self.width-y0, x1
+            x0 = max(0, x0) // self._unit_pixels * self._unit_pixels
+            x1 = -(-min(x1, self.frame_size[0]) // self._unit_pixels) * self._unit_pixels
+            y0, y1 = max(0, y0), min(y1, self.frame_size[1])
+            if (x0 < x1) and (y0 < y1):
+                regions.append((x0, y0, x1, y1))
+        return regions
+    
+    def submit_frame(self, image=None, show=False, damage=None):
+        self.class_logger.info("submit frame to the flush thread",
+                               extra={'className':f"{self.__class__.__name__}:"})
+        img = self._prepare_image(image, show)
         
-        if RUN_ON_RPi:
-            img = np.asarray(image)
-            pix = np.zeros((self.height,self.width,2), dtype = np.uint8)
-            
-            pix[...,[0]] = np.add(np.bitwise_and(img[...,[0]],0xF8),np.right_shift(img[...,[1]],5))
-            pix[...,[1]] = np.add(np.bitwise_and(np.left_shift(img[...,[1]],3),0xE0),np.right_shift(img[...,[2]],3))
-            
-            pix = pix.flatten().tolist()
-            self.SetWindows ( 0, 0, self.width, self.height)
-            self.digital_write(self.DC_PIN,self.GPIO.HIGH)
-            for i in range(0,len(pix),4096):
-                self.spi_writebyte(pix[i:i+4096])
+        if self.instance is not None:
+            # A frame that was not sent yet is overwritten: latest frame wins
+            with self._frame_condition:
+                back = self._buffers[self._back]
+                if (damage is None) or not ((image is None) or (image is self.screen_img)) or not self._packed_valid:
+                    self._pack_frame(img, back)
+                    self._pending_damage = None
+                    # Partial packing can only start from a packed canvas
+                    self._packed_valid = (image is None) or (image is self.screen_img)
+                else:
+                    # Only the damaged canvas rectangles changed since the
+                    # last packed frame, which is the pending one or else the
+                    # one sent last
+                    regions = self._frame_regions(damage)
+                    if not (regions or self._frame_pending):
+                        return None
+                    if not self._frame_pending:
+                        np.copyto(back, self._buffers[1-self._back])
+                        self._pending_damage = []
+                    for x0, y0, x1, y1 in regions:
+                        self._pack_frame(img[y0:y1, x0:x1],
+                                         back[y0:y1, x0//self._unit_pixels:x1//self._unit_pixels])
+                    if self._pending_damage is not None:
+                        self._pending_damage.extend(regions)
+                self._frame_pending = True
+                self._frame_condition.notify()
+        return None
+    
+    def ShowImage(self, image=None, show=False):
+        self.class_logger.info("display frame on screen",
+                               extra={'className':f"{self.__class__.__name__}:"})
+        self.submit_frame(image, show)
+        if self.instance is not None:
+            self._flush_pending()
+        return None
+    
+    def _flush_pending(self):
+        with self._spi_lock:
+            with self._frame_condition:
+                if not self._frame_pending:
+                    return None
+                front = self._buffers[self._back]
+                damage = self._pending_damage
+                self._back = 1 - self._back
+                self._frame_pending = False
+            start = time.perf_counter()
+            self._push_frame(front, damage)
+            self.frame_time += self.FRAME_TIME_SMOOTHING*(time.perf_counter()-start-self.frame_time)
+        return None
+    
+    def _flush_loop(self):
+        self.class_logger.debug("start display flush thread",
+                                extra={'className':f"{self.__class__.__name__}:"})
+        while True:
+            with self._frame_condition:
+                while not (self._frame_pending or self._flush_stop):
+                    self._frame_condition.wait()
+                if self._flush_stop:
+                    break
+            self._flush_pending()
+        self.class_logger.debug("stop display flush thread",
+                                extra={'className':f"{self.__class__.__name__}:"})
+        return None
+    
+    def stop_flush_thread(self):
+        self.class_logger.debug("send pending frame and stop the flush thread",
+                                extra={'className':f"{self.__class__.__name__}:"})
+        if self.flush_thread is not None:
+            with self._frame_condition:
+                self._flush_stop = True
+                self._frame_condition.notify()
+            self.flush_thread.join()
+            self.flush_thread = None
+            self._flush_pending()
+        return None
+    
+    def _pack_rgb565(self, img, buffer):
+        self.class_logger.debug("pack frame to RGB565",
+                                extra={'className':f"{self.__class__.__name__}:"})
+        high = buffer[...,0]
+        low = buffer[...,1]
+        tmp = self._pack_buffer[:buffer.shape[0], :buffer.shape[1]]
+        # RRRRRGGG GGGBBBBB, computed in place with uint8 wrap-around
+        np.bitwise_and(img[...,0], 0xF8, out=high)
+        np.right_shift(img[...,1], 5, out=tmp)
+        np.bitwise_or(high, tmp, out=high)
+        np.left_shift(img[...,1], 3, out=low)
+        np.bitwise_and(low, 0xE0, out=low)
+        np.right_shift(img[...,2], 3, out=tmp)
+        np.bitwise_or(low, tmp, out=low)
+        return None
+    
+    def _pack_rgb444(self, img, buffer):
+        self.class_logger.debug("pack frame to RGB444",
+                                extra={'className':f"{self.__class__.__name__}:"})
+        first = img[:, 0::2]
+        second = img[:, 1::2]
+        tmp = self._pack_buffer[:buffer.shape[0], :buffer.shape[1]]
+        # RRRRGGGG BBBBRRRR GGGGBBBB for each pair of pixels
+        for out, high, low in ((buffer[...,0], first[...,0], first[...,1]),
+                               (buffer[...,1], first[...,2], second[...,0]),
+                               (buffer[...,2], second[...,1], second[...,2])):
+            np.bitwise_and(high, 0xF0, out=out)
+            np.right_shift(low, 4, out=tmp)
+            np.bitwise_or(out, tmp, out=out)
+        return None
+    
+    def _build_night_vision_luts(self):
+        # For each output byte, two (pixels, channel, table) terms to OR
+        # together: the tables hold the channel gain and the bit packing of
+        # the pixel format
+        levels = np.arange(256)
+        r, g, b = (np.round(levels * gain).astype(np.uint8) for gain in self.NIGHT_VISION_GAINS)
+        every, first, second = slice(None), slice(0, None, 2), slice(1, None, 2)
+        if self.pixel_format == 'RGB444':
+            return (((first, 0, r & 0xF0), (first, 1, g >> 4)),
+                    ((first, 2, b & 0xF0), (second, 0, r >> 4)),
+                    ((second, 1, g & 0xF0), (second, 2, b >> 4)))
+        return (((every, 0, r & 0xF8), (every, 1, g >> 5)),
+                ((every, 1, (g << 3) & 0xE0), (every, 2, b >> 3)))
+    
+    def _pack_night_vision(self, img, buffer):
+        self.class_logger.debug(f"pack frame to {self.pixel_format} in night vision",
+                                extra={'className':f"{self.__class__.__name__}:"})
+        tmp = self._pack_buffer[:buffer.shape[0], :buffer.shape[1]]
+        for k, ((pixels_a, channel_a, lut_a), (pixels_b, channel_b, lut_b)) in enumerate(self._night_vision_luts):
+            out = buffer[...,k]
+            np.take(lut_a, img[:, pixels_a, channel_a], out=out, mode='clip')
+            np.take(lut_b, img[:, pixels_b, channel_b], out=tmp, mode='clip')
+            np.bitwise_or(out, tmp, out=out)
+        return None
+    
+    def SetScrollArea(self, top_fixed, scroll_lines, bottom_fixed=None):
+        self.class_logger.info("set display vertical scrolling area",
+                               extra={'className':f"{self.__class__.__name__}:"})
+        if bottom_fixed is None:
+            bottom_fixed = self.height - top_fixed - scroll_lines
+        if (min(top_fixed, scroll_lines, bottom_fixed) < 0) or (top_fixed + scroll_lines + bottom_fixed != self.height):
+            self.class_logger.error(f"Scrolling area must cover the {self.height} display lines",
+                                    extra={'className':f"{self.__class__.__name__}:"})
+            raise ValueError(f"Scrolling area must cover the {self.height} display lines")
+        if (self._scroll_axis == 1) and ((top_fixed % self._unit_pixels) or (scroll_lines % self._unit_pixels)):
+            self.class_logger.error(f"Scrolling area must be aligned on {self._unit_pixels} lines in {self.pixel_format}",
+                                    extra={'className':f"{self.__class__.__name__}:"})
+            raise ValueError(f"Scrolling area must be aligned on {self._unit_pixels} lines in {self.pixel_format}")
+        if self.instance is None:
+            return None
+        with self._spi_lock:
+            # VSCRDEF then VSCSAD back to the first scrolling line
+            self._send_commands(((0x33, bytes((top_fixed>>8 & 0xff, top_fixed & 0xff,
+                                               scroll_lines>>8 & 0xff, scroll_lines & 0xff,
+                                               bottom_fixed>>8 & 0xff, bottom_fixed & 0xff))),
+                                 (0x37, bytes((top_fixed>>8 & 0xff, top_fixed & 0xff)))))
+            if self._scroll_offset:
+                self._last_buffer_valid = False
+            self._scroll_area = (top_fixed, scroll_lines)
+            self._scroll_offset = 0
+        return None
+    
+    def scroll(self, lines):
+        self.class_logger.info(f"scroll display content by {lines} lines",
+                               extra={'className':f"{self.__class__.__name__}:"})
+        # Content moves toward line 0 for positive lines: only the uncovered
+        # lines differ from the last frame and get sent with the next one
+        if self.instance is None:
+            return False
+        if self._scroll_mirrored:
+            self.class_logger.warning(f"Hardware scrolling is not supported with rotation {self.rotation}",
+                                      extra={'className':f"{self.__class__.__name__}:"})
+            return False
+        unit_lines = self._unit_pixels if self._scroll_axis == 1 else 1
+        if lines % unit_lines:
+            self.class_logger.warning(f"Scrolling must move by multiples of {unit_lines} lines in {self.pixel_format}",
+                                      extra={'className':f"{self.__class__.__name__}:"})
+            return False
+        with self._spi_lock:
+            top_fixed, scroll_lines = self._scroll_area
+            self._scroll_offset = (self._scroll_offset + lines) % scroll_lines
+            start = top_fixed + self._scroll_offset
+            self._send_commands(((0x37, bytes((start>>8 & 0xff, start & 0xff))),))
+            area = [slice(None)]*2
+            area[self._scroll_axis] = slice(top_fixed//unit_lines, (top_fixed+scroll_lines)//unit_lines)
+            area = tuple(area)
+            self._last_buffer[area] = np.roll(self._last_buffer[area], -lines//unit_lines, axis=self._scroll_axis)
+        self._discard_damage()
+        return True
+    
+    def _scroll_segments(self, start, end):
+        # Split display lines [start, end) into (start, end, memory line)
+        # pieces that are contiguous in the controller memory
+        top_fixed, scroll_lines = self._scroll_area
+        if self._scroll_offset == 0:
+            return [(start, end, start)]
+        segments = []
+        for low, high, scrolled in ((0, top_fixed, False),
+                                    (top_fixed, top_fixed+scroll_lines, True),
+                                    (top_fixed+scroll_lines, self.height, False)):
+            d0, d1 = max(start, low), min(end, high)
+            if d0 >= d1:
+                continue
+            if not scrolled:
+                segments.append((d0, d1, d0))
+                continue
+            m0 = top_fixed + (d0 - top_fixed + self._scroll_offset) % scroll_lines
+            wrap = d0 + (top_fixed + scroll_lines - m0)
+            if wrap < d1:
+                segments.append((d0, wrap, m0))
+                segments.append((wrap, d1, top_fixed))
+            else:
+                segments.append((d0, d1, m0))
+        return segments
+    
+    def _split_runs(self, mask):
+        # Return [start, end) of the True runs of mask, merging short gaps
+        idx = np.flatnonzero(mask)
+        if idx.size == 0:
+            return []
+        breaks = np.flatnonzero(np.diff(idx) > self.DIRTY_MERGE_GAP)
+        starts = np.concatenate(([idx[0]], idx[breaks+1]))
+        ends = np.concatenate((idx[breaks], [idx[-1]])) + 1
+        return list(zip(starts.tolist(), ends.tolist()))
+    
+    def _merge_regions(self, regions):
+        # Merge two regions when sending their bounding box is cheaper than
+        # sending both of them with their own window setup
+        area = lambda r: (r[2]-r[0])*(r[3]-r[1])
+        merged = True
+        while merged and len(regions) > 1:
+            merged = False
+            for i in range(len(regions)):
+                for j in range(i+1, len(regions)):
+                    a, b = regions[i], regions[j]
+                    union = (min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3]))
+                    if area(union) <= area(a) + area(b) + self.DIRTY_WINDOW_COST:
+                        regions[i] = union
+                        del regions[j]
+                        merged = True
+                        break
+                if merged:
+                    break
+        return regions
+    
+    def _discard_damage(self):
+        # The last sent frame changed under the damaged regions: the next
+        # frame is fully packed and compared
+        with self._frame_condition:
+            self._pending_damage = None
+            self._packed_valid = False
+        return None
+    
+    def _dirty_regions(self, buffer, damage=None):
+        self.class_logger.debug("compute changed regions of the frame",
+                                extra={'className':f"{self.__class__.__name__}:"})
+        if damage is None:
+            areas = [(slice(None), slice(None))]
+        else:
+            # Only the damaged regions can differ from the last frame
+            self._diff_mask.fill(False)
+            areas = [(slice(y0, y1), slice(x0//self._unit_pixels, x1//self._unit_pixels))
+                     for x0, y0, x1, y1 in damage]
+        for area in areas:
+            if self._unit_bytes == 2:
+                np.not_equal(buffer.view('>u2')[...,0][area], self._last_pixels[area], out=self._diff_mask[area])
+            else:
+                np.not_equal(buffer[area], self._last_buffer[area], out=self._diff_bytes[area])
+                np.any(self._diff_bytes[area], axis=2, out=self._diff_mask[area])
+        regions = []
+        for y0, y1 in self._split_runs(self._diff_mask.any(axis=1)):
+            band = self._diff_mask[y0:y1]
+            for x0, x1 in self._split_runs(band.any(axis=0)):
+                rows = np.flatnonzero(band[:, x0:x1].any(axis=1))
+                regions.append((x0, y0+int(rows[0]), x1, y0+int(rows[-1])+1))
+        # Regions are found on units, the display windows are in pixels
+        return [(x0*self._unit_pixels, y0, x1*self._unit_pixels, y1)
+                for x0, y0, x1, y1 in self._merge_regions(regions)]
+    
+    def _push_frame(self, buffer, damage=None):
+        self.class_logger.debug("send changed regions of the frame",
+                                extra={'className':f"{self.__class__.__name__}:"})
+        if self._last_buffer_valid:
+            regions = self._dirty_regions(buffer, damage)
+            dirty_area = sum((x1-x0)*(y1-y0) for x0, y0, x1, y1 in regions)
+            if dirty_area < self.FULL_FRAME_RATIO * self.width * self.height:
+                for x0, y0, x1, y1 in regions:
+                    self._write_region(buffer, x0, y0, x1, y1)
+                np.copyto(self._last_buffer, buffer)
+                return None
+        if self._scroll_offset:
+            self._write_region(buffer, 0, 0, *self.frame_size)
+        else:
+            self._write_frame(buffer.reshape(-1))
+        np.copyto(self._last_buffer, buffer)
+        self._last_buffer_valid = True
+        return None
+    
+    def _write_region(self, buffer, x0, y0, x1, y1):
+        self.class_logger.debug(f"send region ({x0}, {y0}, {x1}, {y1}) to display",
+                                extra={'className':f"{self.__class__.__name__}:"})
+        if self._scroll_axis == 1:
+            for d0, d1, m0 in self._scroll_segments(x0, x1):
+                region = np.ascontiguousarray(buffer[y0:y1, d0//self._unit_pixels:d1//self._unit_pixels]).reshape(-1)
+                self._send_commands((*self._window_commands(m0, y0, m0+d1-d0, y1), (0x2C, region)))
+        else:
+            for d0, d1, m0 in self._scroll_segments(y0, y1):
+                region = np.ascontiguousarray(buffer[d0:d1, x0//self._unit_pixels:x1//self._unit_pixels]).reshape(-1)
+                self._send_commands((*self._window_commands(x0, m0, x1, m0+d1-d0), (0x2C, region)))
+        return None
+    
+    def _write_frame(self, buffer):
+        self.class_logger.debug("send full frame to display",
+                                extra={'className':f"{self.__class__.__name__}:"})
+        if self._full_window_stream is None:
+            self._full_window_stream = self._compile_commands(
+                (*self._window_commands(0, 0, *self.frame_size), (0x2C, b'')))
+        self._send_stream(self._full_window_stream)
+        self._send_stream(((1, buffer, 0),))
         return None
     
     def ClearScreen(self):
         self.class_logger.info("clear display and reset current frame",
                                extra={'className':f"{self.__class__.__name__}:"})
         self._reset_frame()
-        if RUN_ON_RPi:
+        if self.instance is not None:
+            self.stop_flush_thread()
             self.clear(val=0x00)
-            self.module_exit()
+            self.instance.module_exit()
         return None
     
     def clear(self, val=0xff):
         self.class_logger.debug("clear frame buffer content",
                                 extra={'className':f"{self.__class__.__name__}:"})
-        _buffer = [val]*(self.width * self.height * 2)
-        self.SetWindows ( 0, 0, self.width, self.height)
-        self.digital_write(self.DC_PIN,self.GPIO.HIGH)
-        for i in range(0,len(_buffer),4096):
-            self.spi_writebyte(_buffer[i:i+4096])
+        if val not in self._clear_buffers:
+            self._clear_buffers[val] = np.full(self._last_buffer.size, val, dtype=np.uint8)
+        with self._spi_lock:
+            self._write_frame(self._clear_buffers[val])
+            self._last_buffer.fill(val)
+            self._last_buffer_valid = True
+        self._discard_damage()
         return None
@@ -0,0 +1,394 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 17 09:12:40 2026
+
+@author: Er-berry
+"""
+
+import time
+import logging
+import logging.config
+import numpy as np
+
+SCRIPT_NAME = __file__.split('/')[-1]
+
+logging.config.fileConfig('logging.conf')
+lib_logger = logging.getLogger('libLogger')
+lib_logger.debug("Imported file")
+
+# ST7789 commands decoded by the emulator
+CMD_CASET   = 0x2A
+CMD_RASET   = 0x2B
+CMD_RAMWR   = 0x2C
+CMD_VSCRDEF = 0x33
+CMD_MADCTL  = 0x36
+CMD_VSCSAD  = 0x37
+CMD_COLMOD  = 0x3A
+
+# MADCTL bits
+MADCTL_MY = 0x80
+MADCTL_MX = 0x40
+MADCTL_MV = 0x20
+
+
+def expand_rgb565(values:np.ndarray)->np.ndarray:
+    """
+    Expand RGB565 pixel values to RGB888 the way the panel does
+
+    Parameters
+    ----------
+    values : np.ndarray
+        Array of uint16 RGB565 values
+
+    Returns
+    -------
+    np.ndarray
+        uint8 array with a trailing RGB axis
+
+    """
+    values = values.astype(np.uint16)
+    r = (values >> 11) & 0x1F
+    g = (values >> 5) & 0x3F
+    b = values & 0x1F
+    return np.stack(((r << 3) | (r >> 2), (g << 2) | (g >> 4), (b << 3) | (b >> 2)), axis=-1).astype(np.uint8)
+
+
+def expand_rgb444(values:np.ndarray)->np.ndarray:
+    """
+    Expand RGB444 pixel values to RGB888 the way the panel does
+
+    Parameters
+    ----------
+    values : np.ndarray
+        Array of uint16 RGB444 values, 0x0RGB
+
+    Returns
+    -------
+    np.ndarray
+        uint8 array with a trailing RGB axis
+
+    """
+    values = values.astype(np.uint16)
+    rgb = np.stack(((values >> 8) & 0xF, (values >> 4) & 0xF, values & 0xF), axis=-1)
+    return ((rgb << 4) | rgb).astype(np.uint8)
+
+
+class ST7789Emulator:
+    class_logger = logging.getLogger('displayLogger')
+    
+    GRAM_WIDTH = 240
+    GRAM_HEIGHT = 320
+    
+    def __init__(self, spi_freq:int=40000000, x_offset:int=34, width:int=172, height:int=320)->None:
+        self.class_logger.debug("initialise ST7789 emulator",
+                                extra={'className':f"{self.__class__.__name__}:"})
+        self.spi_freq = spi_freq
+        self.x_offset = x_offset
+        self.width = width
+        self.height = height
+        
+        # Cost of one spidev ioctl and one RPi.GPIO write, in seconds
+        self.transaction_overhead = 25e-6
+        self.dc_toggle_overhead = 5e-6
+        
+        self.gram = np.zeros((self.GRAM_HEIGHT, self.GRAM_WIDTH, 3), dtype=np.uint8)
+        self.registers = {}
+        self.reset()
+        self.reset_stats()
+        return None
+    
+    def reset(self)->None:
+        self.class_logger.debug("hardware reset",
+                                extra={'className':f"{self.__class__.__name__}:"})
+        self.dc = 0
+        self.command = None
+        self.params = bytearray()
+        self.madctl = 0x00
+        self.colmod = 0x06
+        self.window = (0, 0, self.GRAM_WIDTH-1, self.GRAM_HEIGHT-1)
+        self.write_pointer = 0
+        self._pending = bytearray()
+        # Vertical scrolling: top fixed, scrolling and bottom fixed lines,
+        # and the memory line shown on the first scrolling line
+        self.scroll_area = (0, self.GRAM_HEIGHT, 0)
+        self.scroll_start = 0
+        return None
+    
+    def reset_stats(self)->None:
+        self.class_logger.debug("reset transfer statistics",
+                                extra={'className':f"{self.__class__.__name__}:"})
+        self.bytes_sent = 0
+        self.pixel_bytes = 0
+        self.transactions = 0
+        self.dc_toggles = 0
+        self.commands = 0
+        self.transfer_time = 0.0
+        return None
+    
+    def stats(self)->dict:
+        return {'bytes'        : self.bytes_sent,
+                'pixel_bytes'  : self.pixel_bytes,
+                'transactions' : self.transactions,
+                'dc_toggles'   : self.dc_toggles,
+                'commands'     : self.commands,
+                'time'         : self.transfer_time,
+                }
+    
+    def set_dc(self, level:int)->None:
+        level = int(bool(level))
+        if level != self.dc:
+            self.dc_toggles += 1
+            self.transfer_time += self.dc_toggle_overhead
+            self.dc = level
+        return None
+    
+    def transfer(self, data:bytes)->None:
+        data = memoryview(data).cast('B')
+        self.transactions += 1
+        self.bytes_sent += len(data)
+        self.transfer_time += len(data) * 8 / self.spi_freq + self.transaction_overhead
+        if self.dc == 0:
+            for cmd in data:
+                self._start_command(cmd)
+        else:
+            self._command_data(data)
+        return None
+    
+    def _start_command(self, cmd:int)->None:
+        self._end_command()
+        self.commands += 1
+        self.command = cmd
+        self.params = bytearray()
+        if cmd == CMD_RAMWR:
+            self.write_pointer = 0
+            self._pending = bytearray()
+        return None
+    
+    def _end_command(self)->None:
+        if self.command is not None and self.command != CMD_RAMWR:
+            self.registers[self.command] = bytes(self.params)
+        return None
+    
+    def _command_data(self, data:memoryview)->None:
+        if self.command == CMD_RAMWR:
+            self.pixel_bytes += len(data)
+            self._write_pixels(data)
+            return None
+        self.params.extend(data)
+        if self.command in (CMD_CASET, CMD_RASET) and len(self.params) >= 4:
+            start = self.params[0] << 8 | self.params[1]
+            end = self.params[2] << 8 | self.params[3]
+            if self.command == CMD_CASET:
+                self.window = (start, self.window[1], end, self.window[3])
+            else:
+                self.window = (self.window[0], start, self.window[2], end)
+        elif self.command == CMD_VSCRDEF and len(self.params) >= 6:
+            self.scroll_area = tuple(self.params[i] << 8 | self.params[i+1] for i in (0, 2, 4))
+        elif self.command == CMD_VSCSAD and len(self.params) >= 2:
+            self.scroll_start = self.params[0] << 8 | self.params[1]
+        elif self.command == CMD_MADCTL:
+            self.madctl = self.params[0]
+        elif self.command == CMD_COLMOD:
+            self.colmod = self.params[0]
+        return None
+    
+    def _decode_pixels(self, data:bytes)->np.ndarray:
+        # Return the RGB888 values of the complete pixels at the start of data
+        # and keep the incomplete bytes for the next transfer
+        raw = np.frombuffer(data, dtype=np.uint8)
+        if self.colmod & 0x07 == 0x03:
+            # 12-bit: RRRRGGGG BBBBRRRR GGGGBBBB for each pair of pixels
+            count = raw.size // 3
+            self._pending = bytearray(data[3*count:])
+            pairs = raw[:3*count].reshape(-1, 3).astype(np.uint16)
+            first = (pairs[:,0] << 4) | (pairs[:,1] >> 4)
+            second = ((pairs[:,1] & 0x0F) << 8) | pairs[:,2]
+            return expand_rgb444(np.stack((first, second), axis=-1).reshape(-1))
+        count = raw.size // 2
+        self._pending = bytearray(data[2*count:])
+        return expand_rgb565(raw[:2*count].view('>u2'))
+    
+    def _write_pixels(self, data:memoryview)->None:
+        rgb = self._decode_pixels(bytes(self._pending) + bytes(data))
+        if rgb.shape[0] == 0:
+            return None
+        x0, y0, x1, y1 = self.window
+        w, h = x1-x0+1, y1-y0+1
+        if w <= 0 or h <= 0:
+            return None
+        index = (self.write_pointer + np.arange(rgb.shape[0])) % (w*h)
+        self.write_pointer = int(index[-1]) + 1
+        col = x0 + index % w
+        row = y0 + index // w
+        
+        # Logical address to memory position, following MADCTL
+        mv = bool(self.madctl & MADCTL_MV)
+        col_max, row_max = (self.GRAM_HEIGHT, self.GRAM_WIDTH) if mv else (self.GRAM_WIDTH, self.GRAM_HEIGHT)
+        if self.madctl & MADCTL_MX:
+            col = col_max - 1 - col
+        if self.madctl & MADCTL_MY:
+            row = row_max - 1 - row
+        x, y = (row, col) if mv else (col, row)
+        
+        valid = (x >= 0) & (x < self.GRAM_WIDTH) & (y >= 0) & (y < self.GRAM_HEIGHT)
+        self.gram[y[valid], x[valid]] = rgb[valid]
+        return None
+    
+    def snapshot(self)->np.ndarray:
+        """
+        Return the visible part of the panel as a (height, width, 3) RGB888
+        array, in the panel's portrait orientation
+        """
+        top_fixed, scroll_lines, bottom_fixed = self.scroll_area
+        lines = np.arange(self.GRAM_HEIGHT)
+        if top_fixed + scroll_lines + bottom_fixed == self.GRAM_HEIGHT and scroll_lines > 0:
+            scrolled = (lines >= top_fixed) & (lines < top_fixed + scroll_lines)
+            lines[scrolled] = top_fixed + (lines[scrolled] - top_fixed + self.scroll_start - top_fixed) % scroll_lines
+        return self.gram[lines[:self.height], self.x_offset:self.x_offset+self.width]
+
+
+class EmulatedSpiDev:
+    def __init__(self, panel:ST7789Emulator, bufsiz:int=4096)->None:
+        self.panel = panel
+        self.bufsiz = bufsiz
+        self.max_speed_hz = panel.spi_freq
+        self.mode = 0b00
+        return None
+    
+    def writebytes(self, data:list)->None:
+        if len(data) > self.bufsiz:
+            raise OverflowError(f"Argument list size exceeds {self.bufsiz} bytes.")
+        self.panel.spi_freq = self.max_speed_hz
+        self.panel.transfer(bytes(data))
+        return None
+    
+    def writebytes2(self, data)->None:
+        # spidev splits buffers into bufsiz-long ioctl transfers
+        self.panel.spi_freq = self.max_speed_hz
+        data = memoryview(data).cast('B')
+        for i in range(0, len(data), self.bufsiz):
+            self.panel.transfer(data[i:i+self.bufsiz])
+        return None
+    
+    def close(self)->None:
+        return None
+
+
+class EmulatedGPIO:
+    BCM = 11
+    OUT = 0
+    IN = 1
+    LOW = 0
+    HIGH = 1
+    PUD_UP = 22
+    
+    class PWM:
+        def __init__(self, pin:int, freq:float)->None:
+            self.pin = pin
+            self.freq = freq
+            self.duty = 0
+            return None
+        
+        def start(self, duty:float)->None:
+            self.duty = duty
+            return None
+        
+        def ChangeDutyCycle(self, duty:float)->None:
+            self.duty = duty
+            return None
+        
+        def ChangeFrequency(self, freq:float)->None:
+            self.freq = freq
+            return None
+        
+        def stop(self)->None:
+            return None
+    
+    def __init__(self, panel:ST7789Emulator, dc:int, rst:int)->None:
+        self.panel = panel
+        self.DC_PIN = dc
+        self.RST_PIN = rst
+        self.pins = {}
+        return None
+    
+    def setmode(self, mode:int)->None:
+        return None
+    
+    def setwarnings(self, flag:bool)->None:
+        return None
+    
+    def setup(self, pin:int, mode:int, **kwargs)->None:
+        self.pins.setdefault(pin, 0)
+        return None
+    
+    def output(self, pin:int, value:int)->None:
+        value = int(bool(value))
+        if pin == self.DC_PIN:
+            self.panel.set_dc(value)
+        elif (pin == self.RST_PIN) and value and not self.pins.get(pin, 1):
+            self.panel.reset()
+        self.pins[pin] = value
+        return None
+    
+    def input(self, pin:int)->int:
+        return self.pins.get(pin, 0)
+    
+    def cleanup(self)->None:
+        return None
+
+
+class EmulatedRaspberryPi:
+    class_logger = logging.getLogger('displayLogger')
+    
+    def __init__(self, spi_bus=0, spi_device=0, spi_freq=40000000, rst=27, dc=25, bl=18, bl_freq=1000):
+        self.class_logger.debug("initialise emulated display interface",
+                                extra={'className':f"{self.__class__.__name__}:"})
+        self.RST_PIN    = rst
+        self.DC_PIN     = dc
+        self.BL_PIN     = bl
+        self.SPEED      = spi_freq
+        self.BL_freq    = bl_freq
+        self.panel      = ST7789Emulator(spi_freq)
+        self.GPIO       = EmulatedGPIO(self.panel, dc, rst)
+        self.SPI        = EmulatedSpiDev(self.panel)
+        self.SPI.max_speed_hz = spi_freq
+        return None
+    
+    def digital_write(self, pin, value):
+        self.GPIO.output(pin, value)
+        return None
+    
+    def digital_read(self, pin):
+        return self.GPIO.input(pin)
+    
+    def delay_ms(self, delaytime):
+        time.sleep(delaytime / 1000.0)
+        return None
+    
+    def spi_writebyte(self, data):
+        self.SPI.writebytes(data)
+        return None
+    
+    def set_bl_DutyCycle(self, duty):
+        self._pwm.ChangeDutyCycle(duty)
+        return None
+    
+    def set_bl_Frequency(self,freq):
+        self._pwm.ChangeFrequency(freq)
+        return None
+    
+    def module_init(self):
+        self.class_logger.debug("initialise emulated backlight and SPI communication",
+                                extra={'className':f"{self.__class__.__name__}:"})
+        self._pwm = self.GPIO.PWM(self.BL_PIN, self.BL_freq)
+        self._pwm.start(100)
+        self.SPI.max_speed_hz = self.SPEED
+        return None
+    
+    def module_exit(self):
+        self.class_logger.debug("emulated SPI end",
+                                extra={'className':f"{self.__class__.__name__}:"})
+        self.SPI.close()
+        self._pwm.stop()
+        return None
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 17 15:02:11 2026
+
+@author: Er-berry
+"""
+
+import logging
+import logging.config
+import threading
+import collections
+from PIL import Image, ImageDraw
+
+SCRIPT_NAME = __file__.split('/')[-1]
+
+logging.config.fileConfig('logging.conf')
+lib_logger = logging.getLogger('libLogger')
+lib_logger.debug("Imported file")
+
+
+class TextCache:
+    class_logger = logging.getLogger('classLogger')
+    
+    def __init__(self, fonts:dict, atlases:dict=None, max_bytes:int=512*1024)->None:
+        self.class_logger.info("initialise rendered text cache",
+                               extra={'className':f"{self.__class__.__name__}:"})
+        self.fonts = fonts
+        self.atlases = atlases if atlases is not None else {}
+        self.max_bytes = max_bytes
+        
+        # Least recently used coverage masks of the rendered strings, keyed by
+        # (font key, text, anchor): the fill colour is applied when pasting
+        self._sprites = collections.OrderedDict()
+        self._sprites_bytes = 0
+        self._sprites_lock = threading.Lock()
+        return None
+    
+    def _render(self, font_key:str, text:str, anchor:str)->tuple:
+        self.class_logger.debug(f"render '{text}' with font '{font_key}'",
+                                extra={'className':f"{self.__class__.__name__}:"})
+        # Glyph atlas first, FreeType for the characters out of the atlas
+        atlas = self.atlases.get(font_key)
+        rendered = atlas.render(text, anchor) if atlas is not None else None
+        if rendered is not None:
+            mask, offset = rendered
+            return (Image.fromarray(mask) if mask is not None else None), offset
+        
+        font = self.fonts[font_key]
+        left, top, right, bottom = font.getbbox(text, anchor=anchor)
+        if (right <= left) or (bottom <= top):
+            return None, (left, top)
+        mask = Image.new(mode="L", size=(right-left, bottom-top), color=0)
+        ImageDraw.Draw(mask).text((-left, -top), text, font=font, fill=255, anchor=anchor)
+        return mask, (left, top)
+    
+    def get(self, font_key:str, text:str, anchor:str=None)->tuple:
+        key = (font_key, text, anchor)
+        with self._sprites_lock:
+            if key in self._sprites:
+                self._sprites.move_to_end(key)
+                return self._sprites[key]
+        sprite = self._render(font_key, text, anchor)
+        size = sprite[0].width * sprite[0].height if sprite[0] is not None else 0
+        with self._sprites_lock:
+            if key not in self._sprites:
+                self._sprites[key] = sprite
+                self._sprites_bytes += size
+            while (self._sprites_bytes > self.max_bytes) and (len(self._sprites) > 1):
+                mask, _ = self._sprites.popitem(last=False)[1]
+                self._sprites_bytes -= mask.width * mask.height if mask is not None else 0
+        return sprite
+    
+    def draw(self, image:Image.Image, xy:tuple, text:str, font_key:str, fill:tuple=(255, 255, 255), anchor:str=None)->None:
+        self.class_logger.debug(f"draw text '{text}'",
+                                extra={'className':f"{self.__class__.__name__}:"})
+        # Multiline text and sub-pixel positions are left to ImageDraw
+        if ('\n' in text) or (xy[0] != int(xy[0])) or (xy[1] != int(xy[1])):
+            ImageDraw.Draw(image).text(xy, text, font=self.fonts[font_key], fill=fill, anchor=anchor)
+            return None
+        mask, (left, top) = self.get(font_key, text, anchor)
+        if mask is not None:
+            image.paste(fill, (int(xy[0])+left, int(xy[1])+top), mask)
+        return None
+    
+    def textbbox(self, xy:tuple, text:str, font_key:str, anchor:str=None)->tuple:
+        self.class_logger.debug(f"get bounding box of text '{text}'",
+                                extra={'className':f"{self.__class__.__name__}:"})
+        if '\n' in text:
+            return ImageDraw.Draw(Image.new(mode="L", size=(1, 1))).textbbox(xy, text, font=self.fonts[font_key], anchor=anchor)
+        mask, (left, top) = self.get(font_key, text, anchor)
+        if mask is None:
+            left, top, right, bottom = self.fonts[font_key].getbbox(text, anchor=anchor)
+        else:
+            right, bottom = left + mask.width, top + mask.height
+        return (xy[0]+left, xy[1]+top, xy[0]+right, xy[1]+bottom)
@@ -8,11 +8,14 @@ Created on Sat Jun 15 14:33:31 2024
 
 import os
 import re
+import mmap
 import time
-import json
+import ctypes
+import ctypes.util
 import logging
 import logging.config
-import filelock
+import multiprocessing
+import numpy as np
 
 OPERATING_SYSTEM = os.uname()
 RUN_ON_RPi = (OPERATING_SYSTEM.sysname == 'Linux') and (OPERATING_SYSTEM.machine in ['aarch64', 'armv6l'])
@@ -28,18 +31,303 @@ PIN_FOCUS = 20
 
 UNIT_CONVERTER = {'s':1, 'ms':1e-3, 'us':1e-6}
 
-tmp_file = "../tmp/running_parameters.tmp"
-tmp_locker = "../tmp/tmp.lock"
-lock = filelock.FileLock(tmp_locker)
+# Lateness of a shutter edge above which the shot over-run is reported
+OVERRUN_TOLERANCE = 2e-3
 
-def _keep_track(taken:int=-1, remaining:int=-1)->None:
-    lib_logger.info("Saving current parameters")
-    keep_track_dict = {"taken":taken, "remaining":remaining}
-    with lock:
-        with open(tmp_file, 'w') as f:
-            json.dump(keep_track_dict, f)
+# Waits sleep until a margin before their deadline then busy-wait, the
+# margin is calibrated from the measured sleep wake-up latency and clamped
+WAIT_CALIBRATION_SAMPLES = 50
+WAIT_MARGIN_LIMITS = (50e-6, 5e-3)
+
+# mlockall() flags of <sys/mman.h>
+MCL_CURRENT = 1
+MCL_FUTURE = 2
+
+# mallopt() parameters of glibc <malloc.h>
+M_TRIM_THRESHOLD = -1
+M_MMAP_MAX = -4
+
+class ProgressBlock:
+    class_logger = logging.getLogger('classLogger')
+    
+    FIELDS = ('taken', 'remaining', 'phase', 'open_time', 'close_time')
+    PHASES = ('idle', 'wake_up', 'exposure', 'interval', 'end')
+    
+    def __init__(self)->None:
+        self.class_logger.debug("initialise shared progress block",
+                                extra={'className':f"{self.__class__.__name__}:"})
+        # Shared memory written by the trigger process and read by the UI
+        # without lock: a sequence counter, odd while the fields are written,
+        # followed by the fields. Timestamps are on the monotonic clock.
+        self._block = multiprocessing.RawArray('d', 1+len(self.FIELDS))
+        return None
+    
+    def write(self, **fields)->None:
+        """
+        Update progress fields, the phase is given by its name, single writer
+
+        """
+        block = self._block
+        block[0] += 1
+        for key, value in fields.items():
+            block[1+self.FIELDS.index(key)] = self.PHASES.index(value) if key == 'phase' else value
+        block[0] += 1
+        return None
+    
+    def read(self)->dict:
+        """
+        Consistent copy of the progress fields, read again while written
+
+        """
+        block = self._block
+        while True:
+            sequence = block[0]
+            if sequence % 2 == 0:
+                values = block[1:]
+                if block[0] == sequence:
+                    break
+            time.sleep(0)
+        progress = dict(zip(self.FIELDS, values))
+        progress['taken'] = int(progress['taken'])
+        progress['remaining'] = int(progress['remaining'])
+        progress['phase'] = self.PHASES[int(progress['phase'])]
+        return progress
+
+class SequenceTelemetry:
+    class_logger = logging.getLogger('classLogger')
+    
+    # Edges rows: the camera wake-up focus pulse, then the shutter open and
+    # close of each shot
+    FOCUS_ON, FOCUS_OFF = range(2)
+    EDGES = ('focus_on', 'focus_off', 'open', 'close')
+    COLUMNS = ('edge', 'shot', 'planned_s', 'actual_s', 'error_ms')
+    
+    def __init__(self, nb_shots:int)->None:
+        self.class_logger.debug(f"initialise telemetry of {nb_shots} shots",
+                                extra={'className':f"{self.__class__.__name__}:"})
+        self.nb_shots = max(1, nb_shots)
+        # Shared memory of the (planned, actual) monotonic time of every edge,
+        # NaN until the edge happens
+        self._edges = multiprocessing.RawArray('d', 2*(2+2*self.nb_shots))
+        self.edges[:] = np.nan
+        return None
+    
+    @property
+    def edges(self)->np.ndarray:
+        return np.frombuffer(self._edges, dtype=np.float64).reshape(-1, 2)
+    
+    def record(self, row:int, planned:float, actual:float)->None:
+        self._edges[2*row] = planned
+        self._edges[2*row+1] = actual
+        return None
+    
+    def record_shot(self, shot:int, closed:bool, planned:float, actual:float)->None:
+        # Shots are numbered from 1
+        self.record(2*shot+int(closed), planned, actual)
+        return None
+    
+    def statistics(self)->dict:
+        return telemetry_statistics(self.edges)
+    
+    def to_csv(self, path:str)->None:
+        self.class_logger.info(f"export sequence telemetry to '{path}'",
+                               extra={'className':f"{self.__class__.__name__}:"})
+        edges = self.edges
+        start = edges[self.FOCUS_ON, 0]
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'w') as f:
+            f.write(",".join(self.COLUMNS)+"\n")
+            for row, (planned, actual) in enumerate(edges):
+                if np.isnan(actual):
+                    continue
+                edge = self.EDGES[row if row < 2 else 2+row%2]
+                f.write(f"{edge},{row//2 if row >= 2 else 0},{planned-start:.6f},{actual-start:.6f},{(actual-planned)*1e3:.3f}\n")
+        return None
+
+def load_telemetry_csv(path:str)->np.ndarray:
+    """
+    Read the (planned, actual) edges of a telemetry CSV file, as
+    SequenceTelemetry.edges
+
+    """
+    rows = []
+    with open(path, 'r') as f:
+        next(f)
+        for line in f:
+            edge, shot, planned, actual, _ = line.strip().split(',')
+            edge = SequenceTelemetry.EDGES.index(edge)
+            rows.append((edge if edge < 2 else 2*int(shot)+edge-2, float(planned), float(actual)))
+    edges = np.full((2+2*max([row//2 for row, _, _ in rows] + [1]), 2), np.nan)
+    for row, planned, actual in rows:
+        edges[row] = (planned, actual)
+    return edges
+
+def telemetry_statistics(edges:np.ndarray)->dict:
+    """
+    Timing errors of a sequence from its edges
+
+    Parameters
+    ----------
+    edges : np.ndarray
+        (planned, actual) times of the edges, as SequenceTelemetry.edges
+
+    Returns
+    -------
+    dict
+        Number of shots taken, mean and 99th percentile of the absolute
+        exposure and interval errors, and the cumulative drift of the last
+        edge, in seconds
+
+    """
+    shots = edges[2:].reshape(-1, 2, 2)
+    shots = shots[~np.isnan(shots[:, 1, 1])]
+    exposure_error = np.diff(shots[:, :, 1], axis=1)[:, 0] - np.diff(shots[:, :, 0], axis=1)[:, 0]
+    interval_error = (shots[1:, 0, 1] - shots[:-1, 1, 1]) - (shots[1:, 0, 0] - shots[:-1, 1, 0])
+    recorded = edges[~np.isnan(edges[:, 1])]
+    
+    def _error(errors):
+        if errors.size == 0:
+            return (0.0, 0.0)
+        return (float(np.mean(errors)), float(np.percentile(np.abs(errors), 99)))
+    
+    statistics = {'shots': len(shots)}
+    statistics['exposure_mean'], statistics['exposure_p99'] = _error(exposure_error)
+    statistics['interval_mean'], statistics['interval_p99'] = _error(interval_error)
+    statistics['drift'] = float(recorded[-1, 1] - recorded[-1, 0]) if len(recorded) else 0.0
+    return statistics
+
+def _sequence_plan(start:float, offset_time:float, exposure_time:float, interval_time:float, nb_shots:int)->list:
+    """
+    Compute the shutter deadlines of a sequence on the monotonic clock
+
+    Parameters
+    ----------
+    start : float
+        Monotonic time of the camera wake-up
+    offset_time : float
+        Camera wake-up time before the first shot, in seconds
+    exposure_time : float
+        Shutter open time of each shot, offset included, in seconds
+    interval_time : float
+        Time between the end of a shot and the next one, in seconds
+    nb_shots : int
+        Number of shots
+
+    Returns
+    -------
+    list
+        (open, close) deadlines of each shot
+
+    """
+    period = exposure_time + interval_time
+    first = start + offset_time
+    # Deadlines are computed from the start, so the errors don't add up
+    return [(first + k*period, first + k*period + exposure_time) for k in range(nb_shots)]
+
+def _calibrate_wait_margin(samples:int=WAIT_CALIBRATION_SAMPLES, request:float=1e-3)->float:
+    """
+    Measure the wake-up latency of time.sleep() to set the margin of
+    _sleep_until()
+
+    Parameters
+    ----------
+    samples : int, optional
+        Number of sleeps measured. The default is WAIT_CALIBRATION_SAMPLES.
+    request : float, optional
+        Duration of each sleep, in seconds. The default is 1e-3.
+
+    Returns
+    -------
+    float
+        99th percentile of the wake-up latency, within WAIT_MARGIN_LIMITS,
+        in seconds
+
+    """
+    latencies = []
+    for _ in range(samples):
+        start = time.perf_counter_ns()
+        time.sleep(request)
+        latencies.append((time.perf_counter_ns() - start)*1e-9 - request)
+    latencies.sort()
+    margin = min(max(latencies[int(0.99*(samples-1))], WAIT_MARGIN_LIMITS[0]), WAIT_MARGIN_LIMITS[1])
+    lib_logger.info(f"Wait margin calibrated to {margin*1e6:.0f}us, median wake-up latency {latencies[samples//2]*1e6:.0f}us")
+    return margin
+
+def _sleep_until(deadline:float, margin:float=0)->float:
+    # Sleep until margin before an absolute monotonic deadline, then
+    # busy-wait on the performance counter, returns the lateness
+    target = time.perf_counter_ns() + int((deadline - time.monotonic())*1e9)
+    delay = (target - time.perf_counter_ns())*1e-9 - margin
+    if delay > 0:
+        time.sleep(delay)
+    while time.perf_counter_ns() < target:
+        pass
+    return time.monotonic() - deadline
+
+def _prefault_heap(size:int)->None:
+    # Write every page of a size bytes buffer so the heap the sequence
+    # allocates from is already mapped and locked, without page faults
+    buffer = bytearray(size)
+    for offset in range(0, size, mmap.PAGESIZE):
+        buffer[offset] = 1
     return None
 
+def _enter_realtime(cpu:int=None, priority:int=80, prefault_size:int=1048576)->list:
+    """
+    Move the calling process to real-time scheduling, each step falls back
+    to the normal scheduling with a warning when it is not permitted
+
+    Parameters
+    ----------
+    cpu : int, optional
+        Core the process is pinned to. The default is None, the last core
+        when there is more than one.
+    priority : int, optional
+        SCHED_FIFO priority, from 1 to 99. The default is 80.
+    prefault_size : int, optional
+        Size in bytes of the heap pre-faulted. The default is 1048576 (1 MiB).
+
+    Returns
+    -------
+    list
+        Real-time features applied
+
+    """
+    applied = []
+    try:
+        cpus = sorted(os.sched_getaffinity(0))
+        if (cpu is not None) or (len(cpus) > 1):
+            cpu = cpus[-1] if cpu is None else cpu
+            os.sched_setaffinity(0, {cpu})
+            applied.append(f"pinned to cpu {cpu}")
+    except (AttributeError, OSError, ValueError) as e:
+        lib_logger.warning(f"Cannot pin the trigger process to cpu {cpu}: {e}")
+    
+    try:
+        os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(priority))
+        applied.append(f"SCHED_FIFO priority {priority}")
+    except (AttributeError, OSError) as e:
+        lib_logger.warning(f"Cannot switch the trigger process to SCHED_FIFO: {e}")
+    
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        if libc.mlockall(MCL_CURRENT | MCL_FUTURE) != 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+        # The freed memory stays in the locked heap instead of going back to
+        # the system and faulting again on the next allocation
+        libc.mallopt(M_TRIM_THRESHOLD, -1)
+        libc.mallopt(M_MMAP_MAX, 0)
+        applied.append("memory locked")
+    except (AttributeError, OSError) as e:
+        lib_logger.warning(f"Cannot lock the trigger process memory: {e}")
+    
+    # With the memory locked, the pages touched now stay resident
+    _prefault_heap(prefault_size)
+    applied.append("heap pre-faulted")
+    lib_logger.info(f"Trigger real-time mode: {', '.join(applied)}")
+    return applied
+
 def _check_pattern(fmt, unit)->bool:
     patterns = [f'({unit})', f'({unit}{unit})', f'(*{unit})', f'(*{unit}{unit})']
     return any([pattern in fmt for pattern in patterns])
@@ -101,8 +389,8 @@ if RUN_ON_RPi:
     GPIO.setup(PIN_SHUTTER, GPIO.OUT)
     GPIO.setup(PIN_FOCUS, GPIO.OUT)
     
-    def execute_sequence(parameters:dict)->None:
-        os.makedirs(os.path.dirname(tmp_file), exist_ok=True)
+    def execute_sequence(parameters:dict, progress:ProgressBlock=None, telemetry:SequenceTelemetry=None, realtime:dict=None)->None:
+        progress = ProgressBlock() if progress is None else progress
         try:
             offset_time = parameters['offset']['value'] * UNIT_CONVERTER[parameters['offset']['unit']]
             
@@ -118,38 +406,59 @@ if RUN_ON_RPi:
         
         lib_logger.info(f"Sequence parameters: exposure={parameters['exposure']['value']}{parameters['exposure']['unit']}, \
 shots={parameters['shots']['value']}, interval={parameters['interval']['value']}{parameters['interval']['unit']}")
-    
-        _keep_track(taken=0, remaining=nb_shots)
+        
+        # At least one shot is taken, as the last one is
+        nb_shots = max(1, nb_shots)
+        progress.write(taken=0, remaining=nb_shots, phase='wake_up')
+        telemetry = SequenceTelemetry(nb_shots) if telemetry is None else telemetry
+        
+        # Opt-in, the shared blocks are touched before the memory is locked
+        if realtime and realtime.get('enabled'):
+            telemetry.edges.sum()
+            _enter_realtime(realtime.get('cpu'), realtime.get('priority', 80), realtime.get('prefault_size', 1048576))
+        
+        # Calibrated with the final scheduling, before the plan starts
+        margin = _calibrate_wait_margin()
+        
+        # Every shutter edge waits for its own absolute deadline, planned
+        # from the wake-up
+        start = time.monotonic()
+        plan = _sequence_plan(start, offset_time, exposure_time, interval_time, nb_shots)
         
         # Wake-up the camera
         GPIO.output(PIN_FOCUS, GPIO.HIGH)
-        time.sleep(0.5*offset_time)
+        telemetry.record(SequenceTelemetry.FOCUS_ON, start, time.monotonic())
+        _sleep_until(start + 0.5*offset_time, margin)
         GPIO.output(PIN_FOCUS, GPIO.LOW)
-        time.sleep(0.5*offset_time)
+        telemetry.record(SequenceTelemetry.FOCUS_OFF, start + 0.5*offset_time, time.monotonic())
         
-        k=1
-        for k in range(1, max(1, nb_shots)):
+        max_overrun = 0
+        for k, (open_time, close_time) in enumerate(plan, start=1):
             lib_logger.info(f"Picture n°{k}/{nb_shots}")
+            open_late = _sleep_until(open_time, margin)
             # Set pin high to take picture
             GPIO.output([PIN_FOCUS, PIN_SHUTTER],
                         [GPIO.HIGH, GPIO.HIGH])
-            time.sleep(exposure_time)
+            opened = time.monotonic()
+            telemetry.record_shot(k, False, open_time, opened)
+            progress.write(phase='exposure', open_time=opened)
+            close_late = _sleep_until(close_time, margin)
             # Set pin low to save the picture
             GPIO.output([PIN_FOCUS, PIN_SHUTTER],
                         [GPIO.LOW, GPIO.LOW])
-            _keep_track(taken=k, remaining=nb_shots-k)
-            lib_logger.debug("sleep")
-            time.sleep(interval_time)
+            closed = time.monotonic()
+            telemetry.record_shot(k, True, close_time, closed)
+            progress.write(taken=k, remaining=nb_shots-k, phase='interval' if k < nb_shots else 'end', close_time=closed)
+            if max(open_late, close_late) > OVERRUN_TOLERANCE:
+                lib_logger.warning(f"Picture n°{k}/{nb_shots} over-run: opened {open_late*1e3:.3f}ms and closed {close_late*1e3:.3f}ms late")
+            max_overrun = max(max_overrun, open_late, close_late)
         
-        lib_logger.info(f"Picture n°{k+1}/{nb_shots}")
-        # Take the last picture outside the loop to bypass the endding interval time
-        GPIO.output([PIN_FOCUS, PIN_SHUTTER],
-                    [GPIO.HIGH, GPIO.HIGH])
-        time.sleep(exposure_time)
         # Leave pin low
-        GPIO.output([PIN_FOCUS, PIN_SHUTTER],
-                    [GPIO.LOW, GPIO.LOW])
-        time.sleep(offset_time)
+        end_late = _sleep_until(plan[-1][1] + offset_time, margin)
+        lib_logger.info(f"Sequence ended {end_late*1e3:.3f}ms after its plan, max shutter over-run {max_overrun*1e3:.3f}ms")
+        statistics = telemetry.statistics()
+        lib_logger.info(f"Exposure error: mean {statistics['exposure_mean']*1e3:.3f}ms, p99 {statistics['exposure_p99']*1e3:.3f}ms, \
+interval error: mean {statistics['interval_mean']*1e3:.3f}ms, p99 {statistics['interval_p99']*1e3:.3f}ms, drift {statistics['drift']*1e3:.3f}ms")
         return None
     
     def _release_gpio()->None:
@@ -165,7 +474,7 @@ shots={parameters['shots']['value']}, interval={parameters['interval']['value']}
         return None
 else:
     lib_logger.warning("Cannot trigger sequence on a non-RaspberryPi board")
-    def execute_sequence(parameters:dict)->None:
+    def execute_sequence(parameters:dict, progress:ProgressBlock=None, telemetry:SequenceTelemetry=None, realtime:dict=None)->None:
         lib_logger.error("Impossible to run execute_sequence()")
         lib_logger.info(f"Input parameters: {parameters}")
         return None
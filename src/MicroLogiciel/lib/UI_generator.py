@@ -8,16 +8,16 @@ Created on Sat Jun  8 11:31:48 2024
 
 import os
 import json
+import math
 import time
 import qrcode
 import logging
-import filelock
 import logging.config
 import subprocess
 import multiprocessing
 import threading
-import numpy as np
 from PIL import Image, ImageDraw
+from lib.UI_widgets import Compositor, Widget, Label, Icon, Bitmap, Box, Painter
 
 
 OPERATING_SYSTEM = os.uname()
@@ -55,6 +55,80 @@ UNIT_CONVERTER = {'s':1, 'ms':1e-3, 'us':1e-6}
 
 BATTERY_SOC = -1
 BATTERY_VOLTAGE = -1
+BATTERY_ICON = None
+
+
+class StatusBar(Widget):
+    class_logger = logging.getLogger('classLogger')
+    
+    STRIPS_SIZE = 16
+    
+    def __init__(self, general_config:dict)->None:
+        self.class_logger.info("initialise status bar strips cache",
+                               extra={'className':f"{self.__class__.__name__}:"})
+        global BATTERY_ICON
+        super().__init__()
+        
+        # Associate general high level attribute to 'self'
+        for key, value in general_config.items():
+            setattr(self, key, value)
+        
+        # Battery icon levels, from the highest to the lowest
+        self.battery_levels = sorted(self.BATTERY_DICT.keys(), reverse=True)
+        
+        # Pre-rendered status bars keyed by (status text, battery icon)
+        self._strips = {}
+        
+        BATTERY_ICON = self.battery_icon(BATTERY_SOC)
+        
+        # Widget state, the status bar is shared by every page
+        self.status_text = ""
+        self.icon = BATTERY_ICON
+        return None
+    
+    @property
+    def bounds(self)->tuple:
+        return (0, 0, 320, 35)
+    
+    def battery_icon(self, soc:float)->str:
+        self.class_logger.debug("get the appropriate battery icon",
+                                extra={'className':f"{self.__class__.__name__}:"})
+        if soc > self.battery_levels[-2]:
+            level = next(level for level in self.battery_levels if level < soc)
+        else:
+            level = self.battery_levels[-1]
+        return self.BATTERY_DICT[level]
+    
+    def _render(self, status_text:str, battery_icon:str)->Image.Image:
+        self.class_logger.debug(f"render status bar for ('{status_text}', '{battery_icon}')",
+                                extra={'className':f"{self.__class__.__name__}:"})
+        strip = Image.new(mode="RGBA", size=(320, 35), color=(0, 0, 0, 255))
+        draw = ImageDraw.Draw(strip)
+        
+        draw.rectangle([(0,0),(320,32)], fill=(64, 64, 64))
+        self.TEXT_CACHE.draw(strip,
+                             (6, 6),
+                             f"{status_text}",
+                             "PixelOperatorMonoBold_L",
+                             fill=(255,255,255),
+                             anchor='lt')
+        
+        draw.rectangle([(254,0),(320,32)], fill=(64, 64, 64))
+        self.ASSETS.paste(strip, battery_icon, (254, 2))
+        return strip
+    
+    def paint(self, image:Image.Image)->None:
+        self.class_logger.debug("add status bar to the display",
+                                extra={'className':f"{self.__class__.__name__}:"})
+        key = (self.status_text, self.icon)
+        strip = self._strips.get(key)
+        if strip is None:
+            strip = self._render(*key)
+            if len(self._strips) >= self.STRIPS_SIZE:
+                del self._strips[next(iter(self._strips))]
+            self._strips[key] = strip
+        image.paste(strip, (0, 0))
+        return None
 
 
 class Page:
@@ -72,44 +146,36 @@ class Page:
         self.page_callbacks = {}
         
         self.STATUS_TXT    = "Ready to GO !"
+        
+        # Retained widgets of the page, from the bottom to the top: the pages
+        # update their state and display() only paints the invalidated ones
+        self.widgets = []
+        self.status_bar = True
+        
+        # Hold repeat count of the key being handled, 0 for a fresh press
+        self.key_repeat = 0
         return None
     
-    def _get_battery_icon(self)->None:
-        self.class_logger.debug("get the appropriate battery icon",
-                                extra={'className':f"{self.__class__.__name__}:"})
-        auth_level = np.array(list(self.BATTERY_DICT.keys()))
-        auth_level[::-1].sort()
-        
-        if BATTERY_SOC>auth_level[-2]:
-            arg = np.argmax(auth_level<BATTERY_SOC)
-        else:
-            arg = -1
-        return self.BATTERY_DICT[auth_level[arg]]
+    def _build_widgets(self)->None:
+        self.class_logger.info("create page widgets",
+                               extra={'className':f"{self.__class__.__name__}:"})
+        self.widgets = []
+        return None
     
-    def _draw_status_bar(self)->None:
-        self.class_logger.debug("add status bar to the display",
+    def _update_status_bar(self)->None:
+        self.class_logger.debug("update status bar state",
                                 extra={'className':f"{self.__class__.__name__}:"})
-        
-        draw = ImageDraw.Draw(self.LCD.screen_img)
-        
-        draw.rectangle([(0,0),(320,34)], fill=(0, 0, 0))
-        draw.rectangle([(0,0),(320,32)], fill=(64, 64, 64))
-        draw.text((6, 6),
-                  f"{self.STATUS_TXT}",
-                  fill=(255,255,255),
-                  font=self.FONTS["PixelOperatorMonoBold_L"],
-                  anchor='lt')
-        
-        draw.rectangle([(254,0),(320,32)], fill=(64, 64, 64))
-        asset_battery = Image.open(self._get_battery_icon())
-        self.LCD.screen_img.paste(asset_battery, (254, 2), asset_battery.convert("RGBA"))
+        self.STATUS_BAR.update(status_text=self.STATUS_TXT, icon=BATTERY_ICON)
         return None
     
     def display(self)->None:
-        self.class_logger.info("initialise new LCD image",
+        self.class_logger.info("render page widgets",
                                extra={'className':f"{self.__class__.__name__}:"})
-        # Generate an image representing the page
-        self.LCD.screen_img = Image.new(mode="RGBA", size=self.LCD.size[::-1], color=(0, 0, 0, 255))
+        widgets = self.widgets
+        if self.status_bar:
+            self._update_status_bar()
+            widgets = [*widgets, self.STATUS_BAR]
+        self.COMPOSITOR.render(widgets, show=BYPASS_BUILTIN_SCREEN)
         return None
     
     def navigate(self, direction:str)->None:
@@ -182,56 +248,61 @@ class Menu(Page):
                                     extra={'className':f"{self.__class__.__name__}:"})
         return None
     
-    def display(self)->None:
-        self.class_logger.info("add menu elements to the display",
+    def _build_widgets(self)->None:
+        self.class_logger.info("create menu widgets",
                                extra={'className':f"{self.__class__.__name__}:"})
-        super().display()
-        draw = ImageDraw.Draw(self.LCD.screen_img, 'RGBA')
+        super()._build_widgets()
         if self.menu_parameters['max_line'] > 0:
             max_line = self.menu_parameters['max_line']
         else:
             max_line = len(self.menu_options)
         
-        # Add menus with icons
+        # One icon and one label per menu line, filled by display()
+        self.menu_lines = []
         for i in range(max_line):
+            icon = None
+            if self.menu_parameters['icon']:
+                icon = Icon(self.ASSETS, "Icon_Empty.png", (self.menu_parameters['icon_left'], 0))
+                self.widgets.append(icon)
+            label_pos = (self.menu_parameters['text_left'],
+                         self.menu_parameters['top_offset'] + self.menu_parameters['text_middle'] + i * self.menu_parameters['step'])
+            label = Label(self.TEXT_CACHE, label_pos, "", f"PixelOperator_{self.menu_parameters['font_size']}", anchor='lm')
+            self.widgets.append(label)
+            self.menu_lines.append((icon, label))
+        
+        # The selection box stays in place over the middle line
+        bbox_pose = (self.menu_parameters['bbox_left'],
+                     self.menu_parameters['top_offset'] + self.menu_parameters['bbox_middle'] - int(self.menu_parameters['bbox_height']/2),
+                     self.menu_parameters['bbox_right']-1,
+                     self.menu_parameters['top_offset'] + self.menu_parameters['bbox_middle'] + int(self.menu_parameters['bbox_height']/2)-1)
+        self.widgets.append(Box(bbox_pose,
+                                radius=self.menu_parameters['bbox_radius'],
+                                fill=None,
+                                outline=(255, 255, 255),
+                                width=self.menu_parameters['bbox_lw']))
+        return None
+    
+    def display(self)->None:
+        self.class_logger.info("update menu widgets",
+                               extra={'className':f"{self.__class__.__name__}:"})
+        for i, (icon, label) in enumerate(self.menu_lines):
             idx = (i-1+self.current_menu)%len(self.menu_options)
             menu = self.menu_options[idx]
             
-            if self.menu_parameters['icon']:
-                icon_path = menu.get("icon", f"{self.PATH_ASSETS}Icon_Empty.png")
-                try:
-                    icon = Image.open(f"{self.PATH_ASSETS}{icon_path}")
-                except:
-                    icon = self.default_icon
+            if icon is not None:
+                icon_name = menu.get("icon", "Icon_Empty.png")
+                icon_height = self.ASSETS.get(icon_name).height
                 icon_pose = (self.menu_parameters['icon_left'],
-                             self.menu_parameters['top_offset'] + self.menu_parameters['icon_middle'] - int(icon.height/2) + i*self.menu_parameters['step'])
-                self.LCD.screen_img.paste(icon, icon_pose)
+                             self.menu_parameters['top_offset'] + self.menu_parameters['icon_middle'] - int(icon_height/2) + i*self.menu_parameters['step'])
+                icon.update(name=icon_name, position=icon_pose)
             
             if i == 1:
-                option_font = self.FONTS[f"PixelOperatorBold_{self.menu_parameters['font_size']}"]
+                option_font = f"PixelOperatorBold_{self.menu_parameters['font_size']}"
             else:
-                option_font = self.FONTS[f"PixelOperator_{self.menu_parameters['font_size']}"]
+                option_font = f"PixelOperator_{self.menu_parameters['font_size']}"
             option_text = menu["name"] if menu["name"] != "" else "[empty name]"
-            option_pos = (self.menu_parameters['text_left'],
-                          self.menu_parameters['top_offset'] + self.menu_parameters['text_middle'] + i * self.menu_parameters['step'])
-            draw.text(option_pos,
-                      option_text,
-                      font=option_font,
-                      fill=(255, 255, 255),
-                      anchor='lm')
-        
-        img = Image.new(mode="RGBA", size=self.LCD.size[::-1], color=(0))
-        draw = ImageDraw.Draw(img, 'RGBA')
-        bbox_pose = (self.menu_parameters['bbox_left'],
-                     self.menu_parameters['top_offset'] + self.menu_parameters['bbox_middle'] - int(self.menu_parameters['bbox_height']/2),
-                     self.menu_parameters['bbox_right']-1,
-                     self.menu_parameters['top_offset'] + self.menu_parameters['bbox_middle'] + int(self.menu_parameters['bbox_height']/2)-1)
-        draw.rounded_rectangle(bbox_pose,
-                               radius=self.menu_parameters['bbox_radius'],
-                               fill=(0, 0, 0, 0),
-                               outline=(255, 255, 255, 255),
-                               width=self.menu_parameters['bbox_lw'])
-        self.LCD.screen_img = Image.alpha_composite(self.LCD.screen_img, img)
+            label.update(text=option_text, font_key=option_font)
+        super().display()
         return None
 
 
@@ -250,11 +321,11 @@ class Button(Page):
         self.current_button = 0
         self.button_active = True
         
-        bboxs = [ImageDraw.Draw(self.LCD.screen_img).textbbox(tuple(button['position']),
-                                                              button["name"] if button["name"] != "" else "[empty name]",
-                                                              font=self.FONTS["PixelOperatorBold_M"],
-                                                              anchor='mm'
-                                                              ) for button in self.button_options]
+        bboxs = [self.TEXT_CACHE.textbbox(tuple(button['position']),
+                                          button["name"] if button["name"] != "" else "[empty name]",
+                                          "PixelOperatorBold_M",
+                                          anchor='mm'
+                                          ) for button in self.button_options]
         self.button_pose = {
             'left'   : [bbox[0] for bbox in bboxs],
             'right'  : [bbox[2] for bbox in bboxs],
@@ -307,48 +378,46 @@ class Button(Page):
                                     extra={'className':f"{self.__class__.__name__}:"})
         return None
     
-    def display(self)->None:
-        self.class_logger.info("add menu elements to the display",
+    def _build_widgets(self)->None:
+        self.class_logger.info("create button widgets",
                                extra={'className':f"{self.__class__.__name__}:"})
-        super().display()
-        draw = ImageDraw.Draw(self.LCD.screen_img)
-        # Add buttons
+        super()._build_widgets()
+        self.button_widgets = []
         for i in range(len(self.button_options)):
             button = self.button_options[i]
-            
-            option_font = self.FONTS["PixelOperator_M"] if i != self.current_button else self.FONTS["PixelOperatorBold_M"]
-            option_pos = tuple(button['position'])
-            option_text = button["name"] if button["name"] != "" else "[empty name]"
-            
+            box = Box((self.button_pose['left'][i]-self.button_pose['pad_x'],
+                       self.button_pose['top'][i]-self.button_pose['pad_y'],
+                       self.button_pose['right'][i]+self.button_pose['pad_x'],
+                       self.button_pose['bottom'][i]+self.button_pose['pad_y']),
+                      radius=self.button_pose['radius'])
+            label = Label(self.TEXT_CACHE,
+                          tuple(button['position']),
+                          button["name"] if button["name"] != "" else "[empty name]",
+                          "PixelOperator_M",
+                          anchor='mm')
+            self.widgets += [box, label]
+            self.button_widgets.append((box, label))
+        return None
+    
+    def display(self)->None:
+        self.class_logger.info("update button widgets",
+                               extra={'className':f"{self.__class__.__name__}:"})
+        for i, (box, label) in enumerate(self.button_widgets):
             if (i == self.current_button) and (self.button_active):
-                draw.rounded_rectangle((self.button_pose['left'][i]-self.button_pose['pad_x'],
-                                        self.button_pose['top'][i]-self.button_pose['pad_y'],
-                                        self.button_pose['right'][i]+self.button_pose['pad_x'],
-                                        self.button_pose['bottom'][i]+self.button_pose['pad_y']),
-                                       radius=self.button_pose['radius'],
-                                       fill=(64, 64, 64),
-                                       outline=(255, 255, 255),
-                                       width=2)
+                box.update(fill=(64, 64, 64), outline=(255, 255, 255), width=2)
             else:
-                draw.rounded_rectangle((self.button_pose['left'][i]-self.button_pose['pad_x'],
-                                        self.button_pose['top'][i]-self.button_pose['pad_y'],
-                                        self.button_pose['right'][i]+self.button_pose['pad_x'],
-                                        self.button_pose['bottom'][i]+self.button_pose['pad_y']),
-                                       radius=self.button_pose['radius'],
-                                       fill=(0, 0, 0),
-                                       outline=(64, 64, 64),
-                                       width=1)
-            draw.text(option_pos,
-                      option_text,
-                      font=option_font,
-                      fill=(255, 255, 255),
-                      anchor='mm')
+                box.update(fill=(0, 0, 0), outline=(64, 64, 64), width=1)
+            label.update(font_key="PixelOperator_M" if i != self.current_button else "PixelOperatorBold_M")
+        super().display()
         return None
 
 
 class Parameter(Page):
     class_logger = logging.getLogger('classLogger')
     
+    # Steps repeated by a held key accelerate: (hold repeats, step multiplier)
+    ACCELERATION = ((0, 1), (10, 10), (25, 100))
+    
     def __init__(self, config:dict)->None:
         self.class_logger.info("initialise parameter specific options",
                                extra={'className':f"{self.__class__.__name__}:"})
@@ -406,21 +475,28 @@ class Parameter(Page):
     def parameter_increment(self)->None:
         self.class_logger.info("increase current parameter value",
                                extra={'className':f"{self.__class__.__name__}:"})
-        parameter = self.parameter_options[self.current_parameter]
-        value = parameter['value']
-        step = parameter['step']
-        parameter['value'] = max(0, value + step)
+        self._step_value(1)
         self.display()
         return None
     
     def parameter_decrement(self)->None:
         self.class_logger.info("decrease current parameter value",
                                extra={'className':f"{self.__class__.__name__}:"})
+        self._step_value(-1)
+        self.display()
+        return None
+    
+    def _step_value(self, direction:int)->None:
+        # A held key repeats the step, the longer it is held the larger the
+        # steps, which then land on multiples of the larger step. A fresh
+        # press always steps by one
+        multiplier = max(multiplier for repeats, multiplier in self.ACCELERATION if self.key_repeat >= repeats)
         parameter = self.parameter_options[self.current_parameter]
         value = parameter['value']
-        step = parameter['step']
-        parameter['value'] = max(0, value - step)
-        self.display()
+        step = parameter['step'] * multiplier
+        if multiplier > 1:
+            value = (math.floor(value/step) if direction > 0 else math.ceil(value/step)) * step
+        parameter['value'] = max(0, value + direction*step)
         return None
     
     def navigate(self, direction:str)->None:
@@ -436,72 +512,65 @@ class Parameter(Page):
             self.class_logger.error(f"KeyError: {e}")
         return None
     
-    def display(self)->None:
-        self.class_logger.info("add parameter elements to the display",
+    def _build_widgets(self)->None:
+        self.class_logger.info("create parameter widgets",
                                extra={'className':f"{self.__class__.__name__}:"})
-        super().display()
-        draw = ImageDraw.Draw(self.LCD.screen_img)
-        # Add parameters with values
+        super()._build_widgets()
+        self.parameter_widgets = []
+        asset_rafter = self.ASSETS.get('Up_down_rafter.png')
         for i in range(len(self.parameter_options)):
             parameter = self.parameter_options[i]
+            middle = self.parameters_pose['top'] + i * self.parameters_pose['step']
             
-            if i == self.current_parameter:
-                font = self.FONTS["PixelOperatorBold_M"]
-            else:
-                font = self.FONTS["PixelOperator_M"]
-            
-            name_pos = (self.parameters_pose['left'], self.parameters_pose['top'] + i * self.parameters_pose['step'])
+            name_pos = (self.parameters_pose['left'], middle)
             name_text = parameter["name"] if parameter["name"] != "" else "[empty name]"
-            draw.text(name_pos,
-                      name_text,
-                      font=font,
-                      fill=(255, 255, 255),
-                      anchor='lm')
+            name = Label(self.TEXT_CACHE, name_pos, name_text, "PixelOperator_M", anchor='lm')
             
             box_pose = (self.parameters_pose['right']+self.parameters_pose['offset'],
-                        self.parameters_pose['top']-self.parameters_pose['pad_y'] + i * self.parameters_pose['step'],
+                        middle-self.parameters_pose['pad_y'],
                         self.parameters_pose['right']+self.parameters_pose['offset']+self.parameters_pose['box_length'],
-                        self.parameters_pose['top']+self.parameters_pose['pad_y'] + i * self.parameters_pose['step'])
+                        middle+self.parameters_pose['pad_y'])
+            box = Box(box_pose, radius=self.parameters_pose['radius'])
+            
+            # Up and down arrows shown while the value is edited
+            rafter_pos = (self.parameters_pose['right']+2*self.parameters_pose['offset'],
+                          middle-int(asset_rafter.size[1]/2))
+            rafter = Icon(self.ASSETS, 'Up_down_rafter.png', rafter_pos, visible=False)
+            
+            value_pos = (box_pose[2]-self.parameters_pose['offset'], middle)
+            value = Label(self.TEXT_CACHE, value_pos, str(parameter["value"]), "PixelOperator_M", anchor='rm')
+            
+            unit_pos = (box_pose[2]+self.parameters_pose['offset'], middle)
+            unit = Label(self.TEXT_CACHE, unit_pos, parameter["unit"], "PixelOperator_M", anchor='lm')
+            
+            self.widgets += [name, box, rafter, value, unit]
+            self.parameter_widgets.append((name, box, rafter, value, unit))
+        return None
+    
+    def display(self)->None:
+        self.class_logger.info("update parameter widgets",
+                               extra={'className':f"{self.__class__.__name__}:"})
+        for i, (name, box, rafter, value, unit) in enumerate(self.parameter_widgets):
+            parameter = self.parameter_options[i]
+            
+            if i == self.current_parameter:
+                font = "PixelOperatorBold_M"
+            else:
+                font = "PixelOperator_M"
+            
             if (i == self.current_parameter) and self.parameter_active:
                 if self.parameter_seleceted:
-                    draw.rounded_rectangle(box_pose,
-                                           radius=self.parameters_pose['radius'],
-                                           fill=(64, 64, 64),
-                                           outline=(255, 255, 255),
-                                           width=2)
-                    asset_rafter = Image.open(self.PATH_ASSETS+'Up_down_rafter.png')
-                    self.LCD.screen_img.paste(asset_rafter,
-                                              (self.parameters_pose['right']+2*self.parameters_pose['offset'],
-                                               self.parameters_pose['top'] + i * self.parameters_pose['step']-int(asset_rafter.size[1]/2)),
-                                              asset_rafter.convert("RGBA"))
+                    box.update(fill=(64, 64, 64), outline=(255, 255, 255), width=2)
                 else:
-                    draw.rounded_rectangle(box_pose,
-                                           radius=self.parameters_pose['radius'],
-                                           fill=(0, 0, 0),
-                                           outline=(255, 255, 255),
-                                           width=2)
+                    box.update(fill=(0, 0, 0), outline=(255, 255, 255), width=2)
             else:
-                draw.rounded_rectangle(box_pose,
-                                       radius=self.parameters_pose['radius'],
-                                       fill=(0, 0, 0),
-                                       outline=(64, 64, 64),
-                                       width=1)
+                box.update(fill=(0, 0, 0), outline=(64, 64, 64), width=1)
+            rafter.update(visible=(i == self.current_parameter) and self.parameter_active and bool(self.parameter_seleceted))
             
-            param_pos = (box_pose[2]-self.parameters_pose['offset'], self.parameters_pose['top'] + i * self.parameters_pose['step'])
-            param_text = str(parameter["value"])
-            draw.text(param_pos,
-                      param_text,
-                      font=font,
-                      fill=(255, 255, 255),
-                      anchor='rm')
-            
-            unit_pos = (box_pose[2]+self.parameters_pose['offset'], self.parameters_pose['top'] + i * self.parameters_pose['step'])
-            unit_text = parameter["unit"]
-            draw.text(unit_pos,
-                      unit_text,
-                      font=font,
-                      fill=(255, 255, 255),
-                      anchor='lm')
+            name.update(font_key=font)
+            value.update(text=str(parameter["value"]), font_key=font)
+            unit.update(font_key=font)
+        super().display()
         return None
 
 
@@ -517,11 +586,12 @@ class Picture(Page):
         self.picture_options = self._config["pictures"]
         
         if 'image' in self.picture_options.keys():
-            self.picture = Image.open(f"{self.PATH_ASSETS}{self.picture_options['image']}")
+            self.picture = self.ASSETS.get(self.picture_options['image'])
         else:
-            self.picture = Image.open(f"{self.PATH_ASSETS}Icon_Empty.png")
+            self.picture = self.ASSETS.get("Icon_Empty.png")
         
         self._set_pose()
+        self.status_bar = False
         
         # Set callbacks for navigation keys
         try:
@@ -557,12 +627,19 @@ class Picture(Page):
         self._set_pose()
         return None
     
+    def _build_widgets(self)->None:
+        self.class_logger.info("create picture widgets",
+                               extra={'className':f"{self.__class__.__name__}:"})
+        super()._build_widgets()
+        self.picture_widget = Bitmap(self.picture, tuple(self.pose))
+        self.widgets.append(self.picture_widget)
+        return None
+    
     def display(self)->None:
-        self.class_logger.info("add picture to the display",
+        self.class_logger.info("update picture widget",
                                extra={'className':f"{self.__class__.__name__}:"})
+        self.picture_widget.update(image=self.picture, position=tuple(self.pose))
         super().display()
-        
-        self.LCD.screen_img.paste(self.picture, self.pose)
         return None
 
 
@@ -594,7 +671,7 @@ class Info(Page):
         return None
     
     def display(self)->None:
-        self.class_logger.info("add infos to the display",
+        self.class_logger.info("render infos widgets",
                                extra={'className':f"{self.__class__.__name__}:"})
         super().display()
         return None
@@ -622,6 +699,21 @@ class ComingSoonPage(Page):
         self.page_callbacks = {**callbacks["page_callbacks"]}
         
         self.action = lambda: None
+        
+        self._build_widgets()
+        return None
+    
+    def _build_widgets(self)->None:
+        self.class_logger.info("create ComingSoonPage widgets",
+                               extra={'className':f"{self.__class__.__name__}:"})
+        super()._build_widgets()
+        icon = self.default_icon
+        self.widgets.append(Bitmap(icon, (160-int(icon.width/2), 60)))
+        
+        option_font = "PixelOperatorBold_M"
+        option_text = "Coming soon"
+        option_pos = (160, 130)
+        self.widgets.append(Label(self.TEXT_CACHE, option_pos, option_text, option_font, fill=(255, 255, 255), anchor='mm'))
         return None
     
     def navigate(self, direction:str)->None:
@@ -635,18 +727,6 @@ class ComingSoonPage(Page):
         self.class_logger.info("display ComingSoonPage",
                                extra={'className':f"{self.__class__.__name__}:"})
         super().display()
-        draw = ImageDraw.Draw(self.LCD.screen_img)
-        
-        icon = self.default_icon
-        self.LCD.screen_img.paste(icon, (160-int(icon.width/2), 60))
-        
-        option_font = self.FONTS["PixelOperatorBold_M"]
-        option_text = "Coming soon"
-        option_pos = (160, 130)
-        draw.text(option_pos, option_text, font=option_font, fill=(255, 255, 255), anchor='mm')
-        
-        self._draw_status_bar()
-        self.LCD.ShowImage(show=BYPASS_BUILTIN_SCREEN)
         return None
 
 
@@ -689,14 +769,14 @@ class MainMenuPage(Menu):
         self.page_callbacks = {**self.page_callbacks, **callbacks["page_callbacks"]}
         
         self.action = lambda: None
+        
+        self._build_widgets()
         return None
     
     def display(self)->None:
         self.class_logger.info("display MainMenuPage",
                                extra={'className':f"{self.__class__.__name__}:"})
         super().display()
-        self._draw_status_bar()
-        self.LCD.ShowImage(show=BYPASS_BUILTIN_SCREEN)
         return None
     
     def navigate(self, direction:str)->None:
@@ -734,6 +814,20 @@ class ShutdownPage(Button):
         self.page_callbacks = {**callbacks["page_callbacks"]}
         
         self.action = lambda: None
+        
+        self._build_widgets()
+        return None
+    
+    def _build_widgets(self)->None:
+        self.class_logger.info("create ShutdownPage widgets",
+                               extra={'className':f"{self.__class__.__name__}:"})
+        super()._build_widgets()
+        icon = self.ASSETS.get(self._config['icon'])
+        icon_pose = (int((self.LCD.size[1] - icon.size[0])/2), 40)
+        self.widgets.append(Icon(self.ASSETS, self._config['icon'], icon_pose))
+        
+        text_pose = (int((self.LCD.size[1])/2), 105)
+        self.widgets.append(Label(self.TEXT_CACHE, text_pose, "Shutdown now ?", "PixelOperator_L", fill=(255,255,255), anchor='mm'))
         return None
     
     def select(self)->None:
@@ -765,18 +859,6 @@ class ShutdownPage(Button):
         self.class_logger.info("display ShutdownPage",
                                extra={'className':f"{self.__class__.__name__}:"})
         super().display()
-        draw = ImageDraw.Draw(self.LCD.screen_img)
-        
-        icon = Image.open(f"{self.PATH_ASSETS}{self._config['icon']}")
-        icon_pose = (int((self.LCD.size[1] - icon.size[0])/2), 40)
-        self.LCD.screen_img.paste(icon, icon_pose)
-        
-        text_font = self.FONTS["PixelOperator_L"]
-        text_pose = (int((self.LCD.size[1])/2), 105)
-        draw.text(text_pose, "Shutdown now ?", fill=(255,255,255), font=text_font, anchor='mm')
-        
-        self._draw_status_bar()
-        self.LCD.ShowImage(show=BYPASS_BUILTIN_SCREEN)
         return None
 
 
@@ -805,8 +887,8 @@ class SequenceParameterPage(Parameter, Button):
             "radius"     : 12,
             "box_length" : 100,
             'right'  : max([
-                ImageDraw.Draw(self.LCD.screen_img).textbbox((12, 0), param['name'],
-                               font=self.FONTS["PixelOperatorBold_M"], anchor='lm')[2]
+                self.TEXT_CACHE.textbbox((12, 0), param['name'],
+                                         "PixelOperatorBold_M", anchor='lm')[2]
                 for param in self.parameter_options]),
             }
             
@@ -846,6 +928,8 @@ class SequenceParameterPage(Parameter, Button):
         self.activate_options()
         
         self.tmp_param_file = "../tmp/sequence_parameters.tmp"
+        
+        self._build_widgets()
         return None
     
     def activate_options(self)->None:
@@ -957,14 +1041,14 @@ class SequenceParameterPage(Parameter, Button):
         self.class_logger.info("display SequenceParameterPage",
                                extra={'className':f"{self.__class__.__name__}:"})
         super().display()
-        self._draw_status_bar()
-        self.LCD.ShowImage(show=BYPASS_BUILTIN_SCREEN)
         return None
 
 
 class SequenceRunningPage(Button):
     class_logger = logging.getLogger('classLogger')
     
+    ERROR_TEXT = "Error 404:\n'../tmp/sequence_parameters.tmp'\nfile  not found !"
+    
     def __init__(self, config:dict, callbacks:dict, general_config:dict)->None:
         self.class_logger.info("initialise SequenceRunningPage",
                                extra={'className':f"{self.__class__.__name__}:"})
@@ -994,8 +1078,58 @@ class SequenceRunningPage(Button):
         self.action = lambda: None
         
         self.tmp_param_file = "../tmp/sequence_parameters.tmp"
-        self.tmp_locker_file = "../tmp/tmp.lock"
-        self.lock = filelock.FileLock(self.tmp_locker_file)
+        
+        self.running_timer = None
+        
+        self._build_widgets()
+        return None
+    
+    def _build_widgets(self)->None:
+        self.class_logger.info("create SequenceRunningPage widgets",
+                               extra={'className':f"{self.__class__.__name__}:"})
+        super()._build_widgets()
+        text_font = "PixelOperator_M"
+        number_font = "PixelOperatorBold_M"
+        self.shots_label = Label(self.TEXT_CACHE, (110, 50), "", number_font, anchor='lm')
+        self.exposed_label = Label(self.TEXT_CACHE, (110, 75), "", number_font, anchor='lm')
+        self.time_left_label = Label(self.TEXT_CACHE, (int(self.LCD.height/2), 140), "", "PixelOperatorBold_L", anchor='mm')
+        self.running_widgets = [
+            Label(self.TEXT_CACHE, (12, 50), "Shot:", text_font, anchor='lm'),
+            self.shots_label,
+            Label(self.TEXT_CACHE, (12, 75), "Exposure:", text_font, anchor='lm'),
+            self.exposed_label,
+            Label(self.TEXT_CACHE, (12, 110), "Time left:", text_font, anchor='lm'),
+            self.time_left_label,
+            ]
+        
+        # Shown instead of the buttons and the tracking without parameters
+        icon = self.ASSETS.get("Icon_Empty.png", (130, 130))
+        icon_pose = (int((self.LCD.size[1] - icon.size[0])/2),
+                     int((self.LCD.size[0] - icon.size[0]+34)/2 ))
+        self.error_widgets = [
+            Icon(self.ASSETS, "Icon_Empty.png", icon_pose, (130, 130)),
+            Painter(self._error_text_bbox(), self._paint_error_text),
+            ]
+        self.widgets += [*self.running_widgets, *self.error_widgets]
+        return None
+    
+    def _error_text_bbox(self)->tuple:
+        return ImageDraw.Draw(self.LCD.screen_img).textbbox((8, 40), self.ERROR_TEXT, font=self.FONTS["PixelOperator_M"], align='center')
+    
+    def _paint_error_text(self, image:Image.Image)->None:
+        ImageDraw.Draw(image).text((8, 40), self.ERROR_TEXT, fill=(255,255,255), font=self.FONTS["PixelOperator_M"], align='center')
+        return None
+    
+    def _show_widgets(self, running:bool)->None:
+        self.class_logger.debug(f"show {'running' if running else 'error'} widgets",
+                                extra={'className':f"{self.__class__.__name__}:"})
+        for box, label in self.button_widgets:
+            box.update(visible=running)
+            label.update(visible=running)
+        for widget in self.running_widgets:
+            widget.update(visible=running)
+        for widget in self.error_widgets:
+            widget.update(visible=not running)
         return None
     
     def navigate(self, direction:str)->None:
@@ -1014,8 +1148,9 @@ class SequenceRunningPage(Button):
         if self.action.__name__ == "go_back":
             self.trigger_process.terminate()
             self.interrupt_event.set()
+            self.EVENT_LOOP.cancel(self.running_timer)
             self.trigger_process.join()
-            self.display_thread.join()
+            self.watcher_thread.join()
             trigger._release_gpio()
             self.class_logger.warning("Interrupt sequence",
                                     extra={'className':f"{self.__class__.__name__}:"})
@@ -1039,50 +1174,39 @@ class SequenceRunningPage(Button):
         self._time_exp = self._exposure['value'] * UNIT_CONVERTER[self._exposure['unit']]
         self._end_time = self.sequence_parameters['sequence_time']['end']
         
+        # Shots progress and shutter edges timing shared with the trigger
+        # process
+        self.progress = trigger.ProgressBlock()
+        self.telemetry = trigger.SequenceTelemetry(self._nb_shots)
+        
         self.PROCESS_DICT = {'trigger':{'target':trigger.execute_sequence,
-                                        'args':(self.sequence_parameters['sequence_parameters'],)},
+                                        'args':(self.sequence_parameters['sequence_parameters'], self.progress, self.telemetry, self.TRIGGER['realtime'])},
                               'display':{'target':self.display_running,
                                         'args':()}
                               }
         self.interrupt_event = threading.Event()
+        self.trigger_process = multiprocessing.Process(target=trigger.execute_sequence,
+                                                   args=(self.sequence_parameters['sequence_parameters'], self.progress, self.telemetry, self.TRIGGER['realtime']))
+        self.trigger_process.start()
+        
+        # The screen is refreshed by the event loop, the watcher thread only
+        # waits for the end of the trigger process
+        # Short exposures don't refresh faster than the display can
+        self.running_timer = self.EVENT_LOOP.call_every(max(self.LCD.frame_time, min(self.UPDATE_TIMES["sequence_running"], self._time_exp/2)),
+                                                        self.display_running)
         self.watcher_thread = threading.Thread(target=self.run_join)
         self.watcher_thread.start()
         return None
     
     def run_join(self)->None:
-        self.trigger_process = multiprocessing.Process(target=trigger.execute_sequence,
-                                                   args=(self.sequence_parameters['sequence_parameters'],))
-        self.display_thread = threading.Thread(target=self.display_running)
-        
-        self.trigger_process.start()
-        self.display_thread.start()
-        
         self.trigger_process.join()
-        self.display_thread.join()
+        self.EVENT_LOOP.post(self.end_sequence)
         return None
     
-    def display_running(self)->None:
-        Ti = time.time()
-        while self.trigger_process.is_alive() and not self.interrupt_event.is_set():
-            if (time.time()-Ti) > min(self.UPDATE_TIMES["sequence_running"], self._time_exp/2):
-                self.class_logger.info("display screen while running",
-                                       extra={'className':f"{self.__class__.__name__}:"})
-                try:
-                    with self.lock:
-                        with open("../tmp/running_parameters.tmp", 'r') as f:
-                            running_track = json.load(f)
-                except FileNotFoundError as e:
-                    self.class_logger.warning(f"File not found: {e}",
-                                              extra={'className':f"{self.__class__.__name__}:"})
-                    return True
-                
-                super().display()
-                self._running_screen(running_track['taken'])
-                self._draw_status_bar()
-                self.LCD.ShowImage(show=BYPASS_BUILTIN_SCREEN)
-                Ti = time.time()
-            else:
-                time.sleep(self.UPDATE_TIMES["thread_scan"])
+    def end_sequence(self)->None:
+        self.EVENT_LOOP.cancel(self.running_timer)
+        # The shots taken by an interrupted sequence are exported too
+        self.telemetry.to_csv(f"{self.PATH_TELEMETRY}sequence_{time.strftime('%Y%m%d_%H%M%S')}.csv")
         if not self.interrupt_event.is_set():
             self.class_logger.warning("end sequence",
                                     extra={'className':f"{self.__class__.__name__}:"})
@@ -1092,48 +1216,40 @@ class SequenceRunningPage(Button):
             self.action()
         return None
     
-    def _running_screen(self, taken:int)->None:
-        fill = (255,255,255)
-        text_font = self.FONTS["PixelOperator_M"]
-        number_font = self.FONTS["PixelOperatorBold_M"]
-        draw = ImageDraw.Draw(self.LCD.screen_img)
+    def display_running(self)->None:
+        self.class_logger.info("display screen while running",
+                               extra={'className':f"{self.__class__.__name__}:"})
+        self._running_screen(self.progress.read())
+        super().display()
+        return None
+    
+    def _running_screen(self, progress:dict)->None:
+        taken = progress['taken']
         # Current shot traking
-        draw.text((12, 50), "Shot:", fill=fill, font=text_font, anchor='lm', align='center')
-        draw.text((110, 50), f"{taken+1}/{self._nb_shots}", fill=fill, font=number_font, anchor='lm', align='center')
-        # Exposed time tracking
-        time_exposed = trigger.time2str(seconds=taken*self._time_exp, fmt='(s)s')
-        draw.text((12, 75), "Exposure:", fill=fill, font=text_font, anchor='lm', align='center')
-        draw.text((110, 75), f"{time_exposed}", fill=fill, font=number_font, anchor='lm', align='center')
+        self.shots_label.update(text=f"{min(taken+1, self._nb_shots)}/{self._nb_shots}")
+        # Exposed time tracking, the current exposure included
+        exposed = taken*self._time_exp
+        if progress['phase'] == 'exposure':
+            exposed += min(self._time_exp, time.monotonic()-progress['open_time'])
+        time_exposed = trigger.time2str(seconds=exposed, fmt='(s)s')
+        self.exposed_label.update(text=f"{time_exposed}")
         # Time left tracking
-        draw.text((12, 110), "Time left:", fill=fill, font=text_font, anchor='lm', align='center')
         time_left = trigger.time2str(seconds=max(0, self._end_time-time.time()), fmt='(*h)h (*m)min (s)s')
-        draw.text((int(self.LCD.height/2), 140), f"{time_left}",
-                  fill=(255,255,255), font=self.FONTS["PixelOperatorBold_L"], anchor='mm', align='center')
+        self.time_left_label.update(text=f"{time_left}")
         return None
     
     def display(self)->None:
         self.class_logger.warning("display SequenceRunningPage",
                                extra={'className':f"{self.__class__.__name__}:"})
-        super().display()
         if os.path.isfile(self.tmp_param_file):
+            # The tracking is rendered by the event loop
+            self._show_widgets(running=True)
             self.run_sequence()
         else:
             self.class_logger.warning("no temporary exchange file found...",
                                       extra={'className':f"{self.__class__.__name__}:"})
-            self.LCD._reset_frame()
-            draw = ImageDraw.Draw(self.LCD.screen_img)
-            icon = Image.open(f"{self.PATH_ASSETS}Icon_Empty.png").resize((130, 130), Image.Resampling.NEAREST)
-            icon_pose = (int((self.LCD.size[1] - icon.size[0])/2),
-                         int((self.LCD.size[0] - icon.size[0]+34)/2 ))
-            self.LCD.screen_img.paste(icon, icon_pose)
-            
-            text_font = self.FONTS["PixelOperator_M"]
-            text_pose = (8, 40)
-            draw.text(text_pose, "Error 404:\n'../tmp/sequence_parameters.tmp'\nfile  not found !",
-                      fill=(255,255,255), font=text_font, align='center')
-        
-            self._draw_status_bar()
-            self.LCD.ShowImage(show=BYPASS_BUILTIN_SCREEN)
+            self._show_widgets(running=False)
+            super().display()
         return None
 
 
@@ -1158,6 +1274,8 @@ class WifiPage(Picture):
         self.page_callbacks = {**callbacks["page_callbacks"]}
         
         self.action = lambda: None
+        
+        self._build_widgets()
         return None
     
     def get_wifi_QRCode(self)->None:
@@ -1198,7 +1316,6 @@ class WifiPage(Picture):
                                extra={'className':f"{self.__class__.__name__}:"})
         self.get_wifi_QRCode()
         super().display()
-        self.LCD.ShowImage(show=BYPASS_BUILTIN_SCREEN)
         return None
 
 
@@ -1223,6 +1340,8 @@ class SmartphonePage(Picture):
         self.page_callbacks = {**callbacks["page_callbacks"]}
         
         self.action = lambda: None
+        
+        self._build_widgets()
         return None
     
     def get_website_QRCode(self)->None:
@@ -1254,7 +1373,6 @@ class SmartphonePage(Picture):
                                extra={'className':f"{self.__class__.__name__}:"})
         self.get_website_QRCode()
         super().display()
-        self.LCD.ShowImage(show=BYPASS_BUILTIN_SCREEN)
         return None
 
 
@@ -1299,14 +1417,14 @@ class SettingPage(Menu):
         self.page_callbacks = {**self.page_callbacks, **callbacks["page_callbacks"]}
         
         self.action = lambda: None
+        
+        self._build_widgets()
         return None
     
     def display(self)->None:
         self.class_logger.info("display MainMenuPage",
                                extra={'className':f"{self.__class__.__name__}:"})
         super().display()
-        self._draw_status_bar()
-        self.LCD.ShowImage(show=BYPASS_BUILTIN_SCREEN)
         return None
     
     def navigate(self, direction:str)->None:
@@ -1357,6 +1475,20 @@ class BatteryPage(Info):
             self.class_logger.error(f"Error: {e}, I2C device INA219 (addr {hex(self.powermeter._address)}) not responding",
                                     extra={'className':f"{self.__class__.__name__}:"})
             self.INA2___is_active = False
+        
+        self.update_timer = None
+        
+        self._build_widgets()
+        return None
+    
+    def _build_widgets(self)->None:
+        self.class_logger.info("create BatteryPage widgets",
+                               extra={'className':f"{self.__class__.__name__}:"})
+        super()._build_widgets()
+        self.error_icon = Bitmap(self.default_icon, (160-int(self.default_icon.width/2), 45), visible=False)
+        self.error_label = Label(self.TEXT_CACHE, (16, 100), "", "PixelOperator_M", fill=(255, 0, 0), visible=False)
+        self.infos_label = Label(self.TEXT_CACHE, (16, 50), "", "PixelOperator_M", fill=(255, 255, 255))
+        self.widgets += [self.error_icon, self.error_label, self.infos_label]
         return None
     
     def update_infos(self)->None:
@@ -1367,68 +1499,115 @@ class BatteryPage(Info):
         #       to values: blue, green, orange, red
         # TODO: Replace value by '--' or 'xx' when a module is not connected and
         #       display an error message inline in red
-        super().display()
-        draw = ImageDraw.Draw(self.LCD.screen_img)
+        option_text = ""
+        if self.MAX17043_is_active:
+            option_text += f"Cell voltage: {self.fuel_gauge.getVCell():.2f} V\n"
+            option_text += f"State of charge: {self.fuel_gauge.getSoc():.1f} %\n"
+        else:
+            option_text += "Cell voltage: -- V\n"
+            option_text += "State of charge: -- %\n"
+        if self.INA2___is_active:
+            option_text += f"RPi current: {self.powermeter.current():.1f} mA\n"
+            option_text += f"RPi power: {self.powermeter.power():.1f} mW\n"
+        else:
+            option_text += "RPi current: -- mA\n"
+            option_text += "RPi power: -- mW\n"
         
+        self.infos_label.update(text=option_text)
+        super().display()
+        return None
+    
+    def navigate(self, direction:str)->None:
+        self.class_logger.info(f"execute '{self.action.__name__}'",
+                               extra={'className':f"{self.__class__.__name__}:"})
+        super().navigate(direction)
+        if self.action.__name__ == "go_back":
+            self.EVENT_LOOP.cancel(self.update_timer)
+            self.update_timer = None
+        self.action()
+        return None
+    
+    def display(self)->None:
+        self.class_logger.info("display BatteryPage",
+                               extra={'className':f"{self.__class__.__name__}:"})
         if not (self.MAX17043_is_active or self.INA2___is_active):
-            self.LCD.screen_img.paste(self.default_icon, (160-int(self.default_icon.width/2), 45))
-            
-            option_font = self.FONTS["PixelOperator_M"]
             option_text = "I2C communication error\n"
             option_text += f"with MAX17043 (addr {hex(self.fuel_gauge._address)})"
             option_text += f"and with INA219 (addr {hex(self.powermeter._address)})"
-            option_pos = (16, 100)
-            draw.text(option_pos, option_text, font=option_font, fill=(255, 0, 0))
-            self._draw_status_bar()
-            self.LCD.ShowImage(show=BYPASS_BUILTIN_SCREEN)
-            self.interrupt_event.set()
+            self.error_icon.update(visible=True)
+            self.error_label.update(text=option_text, visible=True)
+            self.infos_label.update(visible=False)
+            super().display()
+            return None
+        # The infos are refreshed by the event loop until the page is left
+        self.EVENT_LOOP.cancel(self.update_timer)
+        self.update_timer = self.EVENT_LOOP.call_every(self.UPDATE_TIMES['battery_infos'], self.update_infos, delay=0)
+        return None
+
+
+class TelemetryPage(Info):
+    class_logger = logging.getLogger('classLogger')
+    
+    def __init__(self, config:dict, callbacks:dict, general_config:dict)->None:
+        self.class_logger.info("initialise TelemetryPage",
+                               extra={'className':f"{self.__class__.__name__}:"})
         
-        Ti = time.time()
-        while not self.interrupt_event.is_set():
-            if (time.time()-Ti) > self.UPDATE_TIMES['battery_infos']:
-                super().display()
-                draw = ImageDraw.Draw(self.LCD.screen_img)
-                
-                option_text = ""
-                if self.MAX17043_is_active:
-                    option_text += f"Cell voltage: {self.fuel_gauge.getVCell():.2f} V\n"
-                    option_text += f"State of charge: {self.fuel_gauge.getSoc():.1f} %\n"
-                else:
-                    option_text += "Cell voltage: -- V\n"
-                    option_text += "State of charge: -- %\n"
-                if self.INA2___is_active:
-                    option_text += f"RPi current: {self.powermeter.current():.1f} mA\n"
-                    option_text += f"RPi power: {self.powermeter.power():.1f} mW\n"
-                else:
-                    option_text += "RPi current: -- mA\n"
-                    option_text += "RPi power: -- mW\n"
+        # Associate general high level attribute to 'self'
+        for key, value in general_config.items():
+            setattr(self, key, value)
+        
+        super().__init__(config)
+        self._config = config
+        
+        # Set callbacks for navigation keys
+        self.keys_callbacks = {**self.keys_callbacks, **callbacks["keys_callbacks"]}
+        
+        # Set callbacks for navigation
+        self.page_callbacks = {**self.page_callbacks, **callbacks["page_callbacks"]}
+        
+        self.action = lambda: None
         
-                option_font = self.FONTS["PixelOperator_M"]
-                option_pos = (16, 50)
-                draw.text(option_pos, option_text, font=option_font, fill=(255, 255, 255))
-                
-                self._draw_status_bar()
-                self.LCD.ShowImage(show=BYPASS_BUILTIN_SCREEN)
-                Ti = time.time()
-            time.sleep(self.UPDATE_TIMES['thread_scan'])
+        self._build_widgets()
+        return None
+    
+    def _build_widgets(self)->None:
+        self.class_logger.info("create TelemetryPage widgets",
+                               extra={'className':f"{self.__class__.__name__}:"})
+        super()._build_widgets()
+        self.infos_label = Label(self.TEXT_CACHE, (16, 45), "", "PixelOperator_S", fill=(255, 255, 255))
+        self.widgets.append(self.infos_label)
         return None
     
+    def _last_telemetry(self)->str:
+        # Telemetry files are named after their end time
+        try:
+            files = sorted(name for name in os.listdir(self.PATH_TELEMETRY) if name.endswith('.csv'))
+        except FileNotFoundError:
+            return None
+        return files[-1] if files else None
+    
     def navigate(self, direction:str)->None:
         self.class_logger.info(f"execute '{self.action.__name__}'",
                                extra={'className':f"{self.__class__.__name__}:"})
         super().navigate(direction)
-        if (self.action.__name__ == "go_back") and not self.interrupt_event.is_set():
-            self.interrupt_event.set()
-            self.update_thread.join()
         self.action()
         return None
     
     def display(self)->None:
-        self.class_logger.info("display BatteryPage",
+        self.class_logger.info("display TelemetryPage",
                                extra={'className':f"{self.__class__.__name__}:"})
-        self.interrupt_event = threading.Event()
-        self.update_thread = threading.Thread(target=self.update_infos)
-        self.update_thread.start()
+        file_name = self._last_telemetry()
+        if file_name is None:
+            option_text = "No sequence timing recorded yet"
+        else:
+            statistics = trigger.telemetry_statistics(trigger.load_telemetry_csv(self.PATH_TELEMETRY + file_name))
+            option_text = f"{file_name}\n"
+            option_text += f"Shots: {statistics['shots']}\n"
+            option_text += f"Exposure error: {statistics['exposure_mean']*1e3:+.3f} ms (p99 {statistics['exposure_p99']*1e3:.3f} ms)\n"
+            option_text += f"Interval error: {statistics['interval_mean']*1e3:+.3f} ms (p99 {statistics['interval_p99']*1e3:.3f} ms)\n"
+            option_text += f"Cumulative drift: {statistics['drift']*1e3:+.3f} ms"
+        self.infos_label.update(text=option_text)
+        super().display()
         return None
 
 
@@ -1444,7 +1623,10 @@ class PageManager:
         with open(UI_config_path, 'r') as f:
             self.pages_structure = json.load(f)
         
+        # Pages are built on first use, or in the background by warm_up()
         self.pages = {}
+        self.pages_lock = threading.Lock()
+        self.warm_up_thread = None
         self.current_page = None
         self.page_stack = []
         
@@ -1459,6 +1641,7 @@ class PageManager:
             "WifiPage"              : WifiPage,
             "SmartphonePage"        : SmartphonePage,
             "BatteryPage"           : BatteryPage,
+            "TelemetryPage"         : TelemetryPage,
             }
         
         # Define interface level keys callback function
@@ -1468,24 +1651,50 @@ class PageManager:
             }
         # Define interface level page callback function
         self.page_callbacks = {key:self.show_page for key in self.pages_structure.keys()}
+        self.page_callbacks["night_vision"] = self.toggle_night_vision
         
         self.callbacks = {
             "keys_callbacks" : self.keys_callbacks,
             "page_callbacks" : self.page_callbacks,
             }
         
-        self.stop_event = threading.Event()
-        self.battery_SoC_thread = SoCMonitor(self.stop_event, self._general_config)
-        self.battery_SoC_thread.start()
+        # Status bar shared by the pages and updated by the battery monitor
+        self._general_config['STATUS_BAR'] = StatusBar(self._general_config)
         
-        self.load_pages()
+        # Paints the invalidated widgets of the pages on the display canvas
+        self._general_config['COMPOSITOR'] = Compositor(self._general_config['LCD'], self._general_config.get('EVENT_LOOP'))
+        
+        self.battery_SoC_monitor = SoCMonitor(self._general_config)
+        self.battery_SoC_monitor.start()
         return None
     
-    def load_pages(self)->None:
+    def get_page(self, page_key:str)->Page:
+        """
+        Return a page, built from the config file on first use, thread-safe
+
+        """
+        with self.pages_lock:
+            if page_key not in self.pages:
+                self.class_logger.info(f"generate page '{page_key}' based on config file",
+                                       extra={'className':f"{self.__class__.__name__}:"})
+                page_data = self.pages_structure[page_key]
+                self.pages[page_key] = self.class_dict[page_data["class"]](page_data, self.callbacks, self._general_config)
+            return self.pages[page_key]
+    
+    def load_pages(self, page_keys:list=None)->None:
         self.class_logger.info("generate pages based on config file",
                                extra={'className':f"{self.__class__.__name__}:"})
-        for page_key, page_data in self.pages_structure.items():
-            self.pages[page_key] = self.class_dict[page_data["class"]](page_data, self.callbacks, self._general_config)
+        for page_key in (self.pages_structure.keys() if page_keys is None else page_keys):
+            self.get_page(page_key)
+        return None
+    
+    def warm_up(self, page_keys:list)->None:
+        self.class_logger.info(f"build pages {page_keys} in the background",
+                               extra={'className':f"{self.__class__.__name__}:"})
+        # Started once the first page is on screen, a page shown before the
+        # thread built it is built by show_page()
+        self.warm_up_thread = threading.Thread(target=self.load_pages, args=(page_keys,), daemon=True)
+        self.warm_up_thread.start()
         return None
     
     def show_page(self, page_key:str=None)->None:
@@ -1494,7 +1703,7 @@ class PageManager:
         if self.current_page:
             self.page_stack.append(self.current_page)
         
-        self.current_page = self.pages[page_key]
+        self.current_page = self.get_page(page_key)
         self.current_page.display()
         return None
     
@@ -1506,50 +1715,82 @@ class PageManager:
             self.current_page.display()
         return None
     
+    def toggle_night_vision(self, action:str=None)->None:
+        self.class_logger.info("toggle display night vision mode",
+                               extra={'className':f"{self.__class__.__name__}:"})
+        LCD = self._general_config["LCD"]
+        LCD.set_night_vision(not LCD.night_vision)
+        if self.current_page:
+            self.current_page.display()
+        return None
+    
     def shutdown(self)->None:
         self.class_logger.info("shutdown PageManager",
                                extra={'className':f"{self.__class__.__name__}:"})
-        self.stop_event.set()
-        if self.battery_SoC_thread.is_alive():
-            self.battery_SoC_thread.join()
+        self.battery_SoC_monitor.stop()
         self.QUIT = True
+        self._general_config['EVENT_LOOP'].stop()
         return None
 
 
-class SoCMonitor(threading.Thread):
+class SoCMonitor:
     class_logger = logging.getLogger('classLogger')
     
-    def __init__(self, event:threading.Event, general_config:dict)->None:
-        self.class_logger.debug("initialise battery monitoring thread",
+    def __init__(self, general_config:dict)->None:
+        self.class_logger.debug("initialise battery monitoring job",
                                extra={'className':f"{self.__class__.__name__}:"})
-        super(SoCMonitor, self).__init__()
-        self._stop_event = event
-        
         # Associate general high level attribute to 'self'
         for key, value in general_config.items():
             setattr(self, key, value)
+        
+        self.fuel_gauge = None
+        self.timer = None
         return None
     
-    def run(self)->None:
-        self.class_logger.info("Start thread wor",
+    def start(self)->None:
+        self.class_logger.info("schedule battery monitoring",
                                extra={'className':f"{self.__class__.__name__}:"})
+        # Runs on the main thread at start-up, a missing fuel gauge only
+        # disables the monitoring
+        try:
+            self.fuel_gauge = max17043(busnum=1, address=0x36)
+        except (OSError, NameError) as e:
+            self.class_logger.warning(f"{e.__class__.__name__}: {e}, battery monitoring disabled",
+                                      extra={'className':f"{self.__class__.__name__}:"})
+            return None
+        self.timer = self.EVENT_LOOP.call_every(self.UPDATE_TIMES["battery_SoC"], self.update, delay=0)
+        return None
+    
+    def update(self)->None:
+        self.class_logger.debug("read battery state of charge",
+                                extra={'className':f"{self.__class__.__name__}:"})
         global BATTERY_SOC
         global BATTERY_VOLTAGE
-        fuel_gauge = max17043(busnum=1, address=0x36)
-        Ti = time.time()-self.UPDATE_TIMES["battery_SoC"]
+        global BATTERY_ICON
         try:
-            while not self._stop_event.is_set():
-                if (time.time()-Ti) > self.UPDATE_TIMES["battery_SoC"]:
-                    BATTERY_SOC = fuel_gauge.getSoc()
-                    BATTERY_VOLTAGE = fuel_gauge.getVCell()
-                    self.class_logger.info(f"Battery SoC: {BATTERY_SOC:.2f}%; Battery voltage: {BATTERY_VOLTAGE:.3f} V",
-                                           extra={'className':f"{self.__class__.__name__}:"})
-                    Ti = time.time()
-                else:
-                    pass
-                time.sleep(self.UPDATE_TIMES["thread_scan"])
+            BATTERY_SOC = self.fuel_gauge.getSoc()
+            BATTERY_VOLTAGE = self.fuel_gauge.getVCell()
         except OSError as e:
-            self.class_logger.error(f"OSError: {e}, I2C device (addr {hex(fuel_gauge._address)}) not responding",
+            self.class_logger.error(f"OSError: {e}, I2C device (addr {hex(self.fuel_gauge._address)}) not responding",
                                     extra={'className':f"{self.__class__.__name__}:"})
-        fuel_gauge.deinit()
+            self.stop()
+            return None
+        self.class_logger.info(f"Battery SoC: {BATTERY_SOC:.2f}%; Battery voltage: {BATTERY_VOLTAGE:.3f} V",
+                               extra={'className':f"{self.__class__.__name__}:"})
+        # The status bar is only rendered again on an icon change
+        battery_icon = self.STATUS_BAR.battery_icon(BATTERY_SOC)
+        if battery_icon != BATTERY_ICON:
+            self.class_logger.info(f"Battery icon changed to '{battery_icon}'",
+                                   extra={'className':f"{self.__class__.__name__}:"})
+            BATTERY_ICON = battery_icon
+        return None
+    
+    def stop(self)->None:
+        self.class_logger.info("stop battery monitoring",
+                               extra={'className':f"{self.__class__.__name__}:"})
+        self.EVENT_LOOP.cancel(self.timer)
+        self.timer = None
+        if self.fuel_gauge is not None:
+            self.fuel_gauge.deinit()
+            self.fuel_gauge = None
         return None
\ No newline at end of file
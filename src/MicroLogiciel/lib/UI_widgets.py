@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 17 18:12:45 2026
+
+@author: Er-berry
+"""
+
+import math
+import time
+import logging
+import logging.config
+import threading
+import contextlib
+from PIL import Image, ImageDraw
+
+SCRIPT_NAME = __file__.split('/')[-1]
+
+logging.config.fileConfig('logging.conf')
+lib_logger = logging.getLogger('libLogger')
+lib_logger.debug("Imported file")
+
+
+def intersects(a:tuple, b:tuple)->bool:
+    return (a[0] < b[2]) and (b[0] < a[2]) and (a[1] < b[3]) and (b[1] < a[3])
+
+
+class Widget:
+    class_logger = logging.getLogger('classLogger')
+    
+    def __init__(self, visible:bool=True)->None:
+        self.visible = visible
+        
+        # A dirty widget is painted again on the next render. 'painted' holds
+        # the bounds it covers on the canvas, None when it is not on screen
+        self.dirty = True
+        self.painted = None
+        return None
+    
+    @property
+    def bounds(self)->tuple:
+        """
+        Canvas area (left, top, right, bottom) covered by the widget, right
+        and bottom excluded
+
+        """
+        raise NotImplementedError
+    
+    def update(self, **state)->None:
+        """
+        Change widget attributes, the widget is invalidated when one of them
+        changes
+
+        """
+        for key, value in state.items():
+            if getattr(self, key) != value:
+                setattr(self, key, value)
+                self.dirty = True
+        return None
+    
+    def invalidate(self)->None:
+        self.dirty = True
+        return None
+    
+    def paint(self, image:Image.Image)->None:
+        raise NotImplementedError
+
+
+class Label(Widget):
+    class_logger = logging.getLogger('classLogger')
+    
+    def __init__(self, text_cache, position:tuple, text:str, font_key:str, fill:tuple=(255, 255, 255), anchor:str=None, visible:bool=True)->None:
+        super().__init__(visible)
+        self.text_cache = text_cache
+        self.position = position
+        self.text = text
+        self.font_key = font_key
+        self.fill = fill
+        self.anchor = anchor
+        return None
+    
+    @property
+    def bounds(self)->tuple:
+        return self.text_cache.textbbox(self.position, self.text, self.font_key, anchor=self.anchor)
+    
+    def paint(self, image:Image.Image)->None:
+        self.text_cache.draw(image, self.position, self.text, self.font_key, fill=self.fill, anchor=self.anchor)
+        return None
+
+
+class Icon(Widget):
+    class_logger = logging.getLogger('classLogger')
+    
+    def __init__(self, assets, name:str, position:tuple, size:tuple=None, visible:bool=True)->None:
+        super().__init__(visible)
+        self.assets = assets
+        self.name = name
+        self.position = position
+        self.size = size
+        return None
+    
+    @property
+    def bounds(self)->tuple:
+        width, height = self.assets.get(self.name, self.size).size
+        return (self.position[0], self.position[1], self.position[0]+width, self.position[1]+height)
+    
+    def paint(self, image:Image.Image)->None:
+        self.assets.paste(image, self.name, self.position, self.size)
+        return None
+
+
+class Bitmap(Widget):
+    class_logger = logging.getLogger('classLogger')
+    
+    def __init__(self, image:Image.Image, position:tuple, visible:bool=True)->None:
+        super().__init__(visible)
+        self.image = image
+        self.position = position
+        return None
+    
+    @property
+    def bounds(self)->tuple:
+        width, height = self.image.size
+        return (self.position[0], self.position[1], self.position[0]+width, self.position[1]+height)
+    
+    def paint(self, image:Image.Image)->None:
+        image.paste(self.image, self.position)
+        return None
+
+
+class Box(Widget):
+    class_logger = logging.getLogger('classLogger')
+    
+    def __init__(self, xy:tuple, radius:int=0, fill:tuple=None, outline:tuple=None, width:int=1, visible:bool=True)->None:
+        super().__init__(visible)
+        # Rounded rectangle corners as ImageDraw, right and bottom included
+        self.xy = xy
+        self.radius = radius
+        self.fill = fill
+        self.outline = outline
+        self.width = width
+        return None
+    
+    @property
+    def bounds(self)->tuple:
+        return (self.xy[0], self.xy[1], self.xy[2]+1, self.xy[3]+1)
+    
+    def paint(self, image:Image.Image)->None:
+        ImageDraw.Draw(image).rounded_rectangle(self.xy,
+                                                radius=self.radius,
+                                                fill=self.fill,
+                                                outline=self.outline,
+                                                width=self.width)
+        return None
+
+
+class Painter(Widget):
+    class_logger = logging.getLogger('classLogger')
+    
+    def __init__(self, xy:tuple, painter, key=None, visible:bool=True)->None:
+        super().__init__(visible)
+        # Custom drawing in a fixed area, invalidated when 'key' changes
+        self.xy = xy
+        self.painter = painter
+        self.key = key
+        return None
+    
+    @property
+    def bounds(self)->tuple:
+        return self.xy
+    
+    def paint(self, image:Image.Image)->None:
+        self.painter(image)
+        return None
+
+
+class Compositor:
+    class_logger = logging.getLogger('classLogger')
+    
+    def __init__(self, LCD, event_loop=None, background:tuple=(0, 0, 0, 255))->None:
+        self.class_logger.info("initialise widgets compositor",
+                               extra={'className':f"{self.__class__.__name__}:"})
+        self.LCD = LCD
+        self.event_loop = event_loop
+        self.background = background
+        self.screen = (0, 0, *LCD.screen_img.size)
+        
+        # Widgets of the last render, from the bottom to the top
+        self._widgets = None
+        self._lock = threading.Lock()
+        
+        # Thread batching its renders and the last render it requested
+        self._batch_thread = None
+        self._batch_render = None
+        
+        # With an event loop, renders are limited to the display frame rate:
+        # a render requested sooner is deferred and only the last one of the
+        # frame period is done
+        self._last_render = None
+        self._deferred_render = None
+        self._deferred_timer = None
+        return None
+    
+    def _clip(self, bounds:tuple)->tuple:
+        x0, y0 = max(math.floor(bounds[0]), self.screen[0]), max(math.floor(bounds[1]), self.screen[1])
+        x1, y1 = min(math.ceil(bounds[2]), self.screen[2]), min(math.ceil(bounds[3]), self.screen[3])
+        if (x0 >= x1) or (y0 >= y1):
+            return None
+        return (x0, y0, x1, y1)
+    
+    @contextlib.contextmanager
+    def batch(self):
+        """
+        Defer the renders requested by the calling thread in the block to a
+        single render of the last requested widgets when the block exits
+
+        """
+        self._batch_thread = threading.get_ident()
+        try:
+            yield self
+        finally:
+            self._batch_thread = None
+            if self._batch_render is not None:
+                widgets, show = self._batch_render
+                self._batch_render = None
+                self.render(widgets, show)
+    
+    def _render_deferred(self)->None:
+        self._deferred_timer = None
+        if self._deferred_render is not None:
+            widgets, show = self._deferred_render
+            self._deferred_render = None
+            self.render(widgets, show)
+        return None
+    
+    def render(self, widgets:list, show:bool=False)->list:
+        """
+        Paint the invalidated widgets on the display canvas and submit the
+        damaged rectangles to the display
+
+        Parameters
+        ----------
+        widgets : list
+            Widgets on screen, from the bottom to the top
+        show : bool, optional
+            Show the canvas with PIL. The default is False.
+
+        Returns
+        -------
+        list
+            Damaged canvas rectangles (left, top, right, bottom)
+
+        """
+        self.class_logger.debug("render invalidated widgets",
+                                extra={'className':f"{self.__class__.__name__}:"})
+        if threading.get_ident() == self._batch_thread:
+            previous = self._batch_render
+            self._batch_render = (list(widgets), show or ((previous is not None) and previous[1]))
+            return []
+        if self.event_loop is not None:
+            now = time.monotonic()
+            if self._deferred_timer is not None:
+                previous = self._deferred_render
+                self._deferred_render = (list(widgets), show or ((previous is not None) and previous[1]))
+                return []
+            if (self._last_render is not None) and (now - self._last_render < self.LCD.frame_time):
+                self._deferred_render = (list(widgets), show)
+                self._deferred_timer = self.event_loop.call_later(self._last_render+self.LCD.frame_time-now, self._render_deferred)
+                return []
+            self._last_render = now
+        with self._lock:
+            image = self.LCD.screen_img
+            if self._widgets is None:
+                self.LCD.new_frame()
+                self._widgets = []
+            
+            damage = []
+            # Widgets that left the screen are erased
+            on_screen = set(map(id, widgets))
+            for widget in self._widgets:
+                if (id(widget) not in on_screen) and (widget.painted is not None):
+                    damage.append(widget.painted)
+                    widget.painted = None
+                    widget.dirty = True
+            
+            repaint = set()
+            for widget in widgets:
+                if not widget.dirty:
+                    continue
+                if widget.painted is not None:
+                    damage.append(widget.painted)
+                widget.painted = self._clip(widget.bounds) if widget.visible else None
+                if widget.painted is not None:
+                    damage.append(widget.painted)
+                    repaint.add(id(widget))
+                widget.dirty = False
+            
+            # A damaged area is cleared, so every widget it overlaps is painted
+            # again and its whole area added to the damage
+            overlapped = True
+            while overlapped:
+                overlapped = False
+                for widget in widgets:
+                    if (id(widget) not in repaint) and (widget.painted is not None) \
+                       and any(intersects(widget.painted, rect) for rect in damage):
+                        damage.append(widget.painted)
+                        repaint.add(id(widget))
+                        overlapped = True
+            
+            for rect in damage:
+                image.paste(self.background, rect)
+            for widget in widgets:
+                if id(widget) in repaint:
+                    widget.paint(image)
+            self._widgets = list(widgets)
+            self.LCD.submit_frame(show=show, damage=damage)
+        return damage
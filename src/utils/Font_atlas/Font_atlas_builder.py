@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 17 17:25:48 2026
+
+@author: Er-berry
+
+Rasterize every font of config_general.json["fonts"] in a glyph atlas, to be
+memory-mapped by the UI at boot. Missing or outdated atlases are also built
+on the fly by the UI.
+
+    python3 Font_atlas_builder.py
+"""
+
+import os
+import sys
+import json
+
+PATH_MICROLOGICIEL = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'MicroLogiciel')
+sys.path.insert(0, PATH_MICROLOGICIEL)
+os.chdir(PATH_MICROLOGICIEL)
+
+from lib.Font_atlas import build_atlas
+
+
+if __name__ == '__main__':
+    with open('config_general.json', 'r') as f:
+        general_config = json.load(f)
+    path_fonts = general_config["paths"]["PATH_FONTS"]
+    path_atlas = general_config["paths"]["PATH_FONT_ATLAS"]
+    
+    for key, data in general_config["fonts"].items():
+        build_atlas(path_fonts + data['path'], data['size'], path_atlas + key)
+        print(f"{key:<24} -> {path_atlas}{key}.npy")
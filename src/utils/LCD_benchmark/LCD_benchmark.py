@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 17 10:05:12 2026
+
+@author: Er-berry
+
+Benchmark the LCD_1inch47 transfer path against the ST7789 emulator and
+check that the emulated panel shows the expected pixels.
+
+    python3 LCD_benchmark.py [repeat] [pixel_format]
+"""
+
+import os
+import sys
+import json
+import time
+import numpy as np
+from PIL import Image, ImageDraw
+
+PATH_MICROLOGICIEL = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'MicroLogiciel')
+sys.path.insert(0, PATH_MICROLOGICIEL)
+os.chdir(PATH_MICROLOGICIEL)
+
+from lib import LCD_display
+from lib.ST7789_emulator import expand_rgb565, expand_rgb444
+
+
+def expected_panel(image:Image.Image, pixel_format:str='RGB565')->np.ndarray:
+    # What the panel should show for a landscape UI frame, quantised to the
+    # pixel format
+    img = np.asarray(image.convert("RGB").transpose(LCD_display.ROTATE_270)).astype(np.uint16)
+    if pixel_format == 'RGB444':
+        return expand_rgb444(((img[...,0] & 0xF0) << 4) | (img[...,1] & 0xF0) | (img[...,2] >> 4))
+    rgb565 = ((img[...,0] & 0xF8) << 8) | ((img[...,1] & 0xFC) << 3) | (img[...,2] >> 3)
+    return expand_rgb565(rgb565)
+
+
+def test_frame(step:int=0)->Image.Image:
+    img = Image.new(mode="RGBA", size=(320, 172), color=(0, 0, 0, 255))
+    draw = ImageDraw.Draw(img)
+    draw.rectangle([(0,0),(320,32)], fill=(64, 64, 64))
+    draw.rectangle([(12, 50), (300, 150)], outline=(255, 255, 255), width=2)
+    draw.text((20, 80), f"value {step}", fill=(255, 255, 255))
+    draw.rectangle([(254,2),(314,30)], fill=(0, 200, 64))
+    return img
+
+
+def scrolled_frame(image:Image.Image, lines:int)->Image.Image:
+    # The same frame moved by lines toward the left, new columns on the right
+    img = Image.new(mode="RGBA", size=image.size, color=(0, 0, 0, 255))
+    img.paste(image.crop((lines, 0, image.width, image.height)), (0, 0))
+    ImageDraw.Draw(img).rectangle([(image.width-lines, 60), (image.width, 110)], fill=(200, 32, 32))
+    return img
+
+
+def measure(lcd:LCD_display.LCD_1inch47, name:str, function, repeat:int=1)->dict:
+    panel = lcd.instance.panel
+    panel.reset_stats()
+    Ti = time.perf_counter()
+    for k in range(repeat):
+        function(k)
+    cpu_time = (time.perf_counter()-Ti)/repeat
+    stats = {key:value/repeat for key, value in panel.stats().items()}
+    print(f"{name:<18} cpu {cpu_time*1e3:8.3f} ms | bus {stats['time']*1e3:8.3f} ms | "
+          f"{stats['bytes']:9.0f} B | {stats['transactions']:6.1f} xfer | {stats['dc_toggles']:5.1f} DC")
+    return stats
+
+
+if __name__ == '__main__':
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    
+    with open('config_general.json', 'r') as f:
+        display_config = {**json.load(f)["display"], "emulate": True}
+    if len(sys.argv) > 2:
+        display_config["pixel_format"] = sys.argv[2]
+    pixel_format = display_config.get("pixel_format", 'RGB565')
+    
+    lcd = LCD_display.LCD_1inch47(**display_config)
+    lcd.stop_flush_thread()
+    panel = lcd.instance.panel
+    
+    measure(lcd, "Init", lambda k: lcd.Init())
+    measure(lcd, "clear", lambda k: lcd.clear(), repeat)
+    
+    frames = [test_frame(k) for k in range(repeat+1)]
+    def full_frame(k:int)->None:
+        lcd._last_buffer_valid = False
+        lcd.ShowImage(frames[0])
+        return None
+    measure(lcd, "ShowImage (full)", full_frame, repeat)
+    ok_full = np.array_equal(panel.snapshot(), expected_panel(frames[0], pixel_format))
+    measure(lcd, "ShowImage (part)", lambda k: lcd.ShowImage(frames[k+1]), repeat)
+    ok_part = np.array_equal(panel.snapshot(), expected_panel(frames[repeat], pixel_format))
+    
+    ok_scroll = True
+    if lcd._scroll_axis == 1 and not lcd._scroll_mirrored:
+        scrolled = [frames[repeat]]
+        for k in range(repeat):
+            scrolled.append(scrolled_frame(scrolled[-1], 8))
+        def scroll_frame(k:int)->None:
+            lcd.scroll(8)
+            lcd.ShowImage(scrolled[k+1])
+            return None
+        measure(lcd, "scroll + ShowImage", scroll_frame, repeat)
+        ok_scroll = np.array_equal(panel.snapshot(), expected_panel(scrolled[repeat], pixel_format))
+        lcd._last_buffer_valid = False
+        lcd.ShowImage(scrolled[repeat])
+        ok_scroll = ok_scroll and np.array_equal(panel.snapshot(), expected_panel(scrolled[repeat], pixel_format))
+        lcd.SetScrollArea(0, lcd.height)
+        lcd._last_buffer_valid = False
+        lcd.ShowImage(frames[0])
+        ok_scroll = ok_scroll and np.array_equal(panel.snapshot(), expected_panel(frames[0], pixel_format))
+    
+    print(f"pixel check: full frame {'OK' if ok_full else 'FAILED'}, partial update {'OK' if ok_part else 'FAILED'}, "
+          f"scroll {'OK' if ok_scroll else 'FAILED'}")
+    sys.exit(0 if (ok_full and ok_part and ok_scroll) else 1)